@@ -1,15 +1,17 @@
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
-from openai import AzureOpenAI
+from typing import AsyncIterator, Dict, List, Optional
+from openai import AsyncAzureOpenAI
+from functools import lru_cache
+import asyncio
+import copy
+import hashlib
 import json
+import orjson
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
 
 class ActivityType(str, Enum):
     """Enumeration of activity types."""
@@ -20,11 +22,15 @@ class ActivityType(str, Enum):
     ACCOMMODATION = "accommodation"
 
 
+# Activity and Trip must stay Pydantic models: responses.parse(text_format=Trip)
+# derives the strict structured-output schema from them and validates the reply.
 class Activity(BaseModel):
     """
     Model representing a single activity in a trip itinerary.
     Activities can be nested to represent sub-activities.
     """
+    model_config = ConfigDict(defer_build=True)
+    
     activity_id: str = Field(..., description="Unique identifier for the activity")
     activity_name: str = Field(..., description="Name of the activity")
     activity_type: ActivityType = Field(..., description="Type of activity")
@@ -44,71 +50,171 @@ class Trip(BaseModel):
     """
     Model representing a complete trip itinerary.
     """
+    model_config = ConfigDict(defer_build=True)
+    
     trip_name: str = Field(..., description="Name of the trip")
     trip_id: str = Field(..., description="Unique identifier for the trip")
     activities: List[Activity] = Field(..., description="List of activities in the trip")
     trip_summary: str = Field(..., description="A comprehensive description of the trip and activities")
 
 
-def infer_vigor_from_type(activity_type: str) -> str:
-    """Infer vigor level from activity type."""
-    vigor_map = {
-        "attraction": "medium",
-        "travel": "low",
-        "food": "low",
-        "entertainment": "medium",
-        "accommodation": "low"
-    }
-    return vigor_map.get(activity_type.lower(), "medium")
+@lru_cache(maxsize=1)
+def _get_client() -> AsyncAzureOpenAI:
+    """Return the shared async Azure OpenAI client, created on first use.
+
+    Reusing one client keeps its HTTP connection pool (and the TLS sessions
+    in it) alive across calls instead of reconnecting for every request.
+    The client is async so LLM round-trips never block the event loop.
+    """
+    return AsyncAzureOpenAI()
+
+
+BRAINSTORM_SYSTEM_PROMPT = "You are a helpful assistant and a expert trip planner"
+
+FINAL_PLAN_SYSTEM_PROMPT = (
+    "You are a helpful assistant and an expert trip planner. Your task is to merge multiple trip "
+    "suggestions into one cohesive final plan, prioritizing activities, locations, and cuisines "
+    "that received the most votes in polls."
+)
+
+FINAL_PLAN_INSTRUCTIONS = "\n".join([
+    "I have multiple trip suggestions from different users. Please create a final unified trip plan that:",
+    "1. Merges the best elements from all suggestions",
+    "2. Incorporates the poll results (activities, locations, and cuisines that received the most votes)",
+    "3. Creates a cohesive, well-structured itinerary",
+    "\n",
+])
+
+PLAN_SUMMARY_SYSTEM_PROMPT = (
+    "You are an expert trip planner. Condense the trip suggestion you are given into a compact "
+    "day-by-day outline. For every activity keep its name, type, location, start and end date-time "
+    "and coordinates; shorten descriptions to a few words."
+)
+
+
+# Exact-match cache for initial trip generations, keyed on a hash of
+# (model, system prompt, user prompt). Iterations embed the previous plan in
+# the prompt and practically never repeat, so only initial queries use it.
+_RESPONSE_CACHE_MAX_ENTRIES = 256
+_response_cache: Dict[str, dict] = {}
+
+
+def _prompt_cache_key(model: str, system_prompt: str, prompt: str) -> str:
+    """Hash the full request identity into a short cache key."""
+    raw = "\x00".join((model, system_prompt, prompt))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _cache_response(key: str, result: dict) -> None:
+    """Store a transformed result, evicting the oldest entry when full."""
+    if len(_response_cache) >= _RESPONSE_CACHE_MAX_ENTRIES:
+        _response_cache.pop(next(iter(_response_cache)))
+    _response_cache[key] = copy.deepcopy(result)
+
+
+def _dumps_for_prompt(data) -> str:
+    """Serialize plan data for a prompt; orjson encodes datetimes natively."""
+    return orjson.dumps(data, default=str, option=orjson.OPT_NAIVE_UTC).decode("utf-8")
+
+
+@lru_cache(maxsize=1)
+def _trip_adapter() -> TypeAdapter:
+    """Return the shared TypeAdapter for Trip, built on first use (keeps defer_build lazy)."""
+    return TypeAdapter(Trip)
+
+
+def _trip_to_dict(trip: Trip) -> dict:
+    """
+    Convert a parsed Trip into plain JSON data (datetimes as ISO strings).
+    
+    Equivalent to model_dump(mode='json'), but the JSON is emitted by
+    pydantic-core through the cached Trip adapter and parsed back by orjson
+    instead of walked in Python.
+    """
+    return orjson.loads(_trip_adapter().dump_json(trip))
+
+
+VIGOR_BY_ACTIVITY_TYPE = {
+    "attraction": "medium",
+    "travel": "low",
+    "food": "low",
+    "entertainment": "medium",
+    "accommodation": "low"
+}
 
 
 def transform_activity_to_frontend_format(activity: dict) -> dict:
-    """Transform an activity from OpenAI format to frontend format."""
-    # Handle datetime objects - convert to ISO string if needed
-    from_dt = activity.get("from_date_time", "")
-    to_dt = activity.get("to_date_time", "")
+    """
+    Transform an activity from OpenAI format to frontend format.
     
-    if isinstance(from_dt, datetime):
-        from_dt = from_dt.isoformat()
-    if isinstance(to_dt, datetime):
-        to_dt = to_dt.isoformat()
+    The activity must be JSON-mode data (as produced by _trip_to_dict), so
+    date-times are already ISO-8601 strings and are passed through as-is.
+    """
+    get = activity.get
+    activity_id = get("activity_id", "")
+    activity_type = (get("activity_type") or "").lower()
     
     return {
-        "id": activity.get("activity_id", ""),
-        "activity_id": activity.get("activity_id", ""),
-        "activity_name": activity.get("activity_name", ""),
-        "type": activity.get("activity_type", "").lower() if activity.get("activity_type") else "",
-        "description": activity.get("activity_description", ""),
-        "from_date_time": from_dt,
-        "to_date_time": to_dt,
-        "location": activity.get("start_location", ""),
-        "vigor": infer_vigor_from_type(activity.get("activity_type", "")),
-        "start_lat": activity.get("start_lat", 0.0),
-        "start_lon": activity.get("start_lon", 0.0),
-        "end_lat": activity.get("end_lat", 0.0),
-        "end_lon": activity.get("end_lon", 0.0)
+        "id": activity_id,
+        "activity_id": activity_id,
+        "activity_name": get("activity_name", ""),
+        "type": activity_type,
+        "description": get("activity_description", ""),
+        "from_date_time": get("from_date_time", ""),
+        "to_date_time": get("to_date_time", ""),
+        "location": get("start_location", ""),
+        "vigor": VIGOR_BY_ACTIVITY_TYPE.get(activity_type, "medium"),
+        "start_lat": get("start_lat", 0.0),
+        "start_lon": get("start_lon", 0.0),
+        "end_lat": get("end_lat", 0.0),
+        "end_lon": get("end_lon", 0.0)
     }
 
 
 def flatten_activities(activities: list) -> list:
-    """Flatten nested activities into a single list."""
+    """Flatten nested activities into a single list (parents before their sub-activities)."""
     flattened = []
-    for activity in activities:
+    # Depth-first walk with an explicit stack; children are pushed in reverse
+    # so they are popped in their original order
+    stack = list(reversed(activities))
+    while stack:
+        activity = stack.pop()
         # Add the main activity
         flattened.append(activity)
         # Add nested activities if they exist
-        nested = activity.get("activities", [])
+        nested = activity.get("activities")
         if nested:
-            flattened.extend(flatten_activities(nested))
+            stack.extend(reversed(nested))
     return flattened
 
 
+def _extract_date_slow(from_dt) -> str:
+    """Extract a YYYY-MM-DD date from a non-canonical date string."""
+    if isinstance(from_dt, str):
+        # Parse date from ISO format string (e.g., "2024-09-01T14:00:00+03:00" or "2024-09-01 14:00:00+03:00")
+        if 'T' in from_dt:
+            return from_dt.split('T')[0]
+        if ' ' in from_dt:
+            return from_dt.split(' ')[0]
+        return from_dt[:10] if len(from_dt) >= 10 else ""
+    return ""
+
+
+@dataclass(slots=True)
+class _Day:
+    """Per-day aggregate used while grouping; serialised to a dict at the end."""
+    date: str
+    location: str
+    activities: list
+
+
 def transform_trip_to_days(trip_data: dict) -> list:
     """
     Transform Trip object (with flat activities list) into days format expected by frontend.
     
     Args:
-        trip_data: Dictionary containing trip data from OpenAI (trip_name, trip_id, activities, trip_summary)
+        trip_data: JSON-mode dictionary of trip data from OpenAI (trip_name, trip_id, activities, trip_summary),
+            as returned by _trip_to_dict; date-times are ISO-8601 strings
     
     Returns:
         List of day objects, each containing activities grouped by date
@@ -117,66 +223,139 @@ def transform_trip_to_days(trip_data: dict) -> list:
     if not activities:
         return []
     
-    # Flatten nested activities
+    # Flatten nested activities and order them by start time once, so days
+    # (and the activities within each day) are created in chronological order.
+    # ISO-8601 timestamps sort correctly as plain strings.
     flattened_activities = flatten_activities(activities)
+    flattened_activities.sort(key=lambda activity: activity.get("from_date_time") or "")
     
-    # Group activities by date
-    days_dict = {}
+    # Group activities by date in a single pass. Activities arrive in date
+    # order, so days are created (and later numbered) in chronological order.
+    days_dict: Dict[str, _Day] = {}
     
     for activity in flattened_activities:
         # Extract date from from_date_time
         from_dt = activity.get("from_date_time", "")
         
-        # Handle different datetime formats
-        if isinstance(from_dt, datetime):
-            date_str = from_dt.strftime("%Y-%m-%d")
-        elif isinstance(from_dt, str):
-            # Parse date from ISO format string (e.g., "2024-09-01T14:00:00+03:00" or "2024-09-01 14:00:00+03:00")
-            try:
-                if 'T' in from_dt:
-                    date_str = from_dt.split('T')[0]
-                elif ' ' in from_dt:
-                    date_str = from_dt.split(' ')[0]
-                else:
-                    date_str = from_dt[:10] if len(from_dt) >= 10 else ""
-            except:
-                date_str = from_dt[:10] if len(from_dt) >= 10 else ""
+        # Canonical ISO-8601 strings (what model_dump(mode='json') emits) carry
+        # the date in their first 10 characters
+        if isinstance(from_dt, str) and len(from_dt) >= 10 and from_dt[4] == '-' and from_dt[7] == '-':
+            date_str = from_dt[:10]
         else:
-            date_str = ""
+            date_str = _extract_date_slow(from_dt)
         
         if not date_str:
             continue
         
-        # Get location from first activity of the day, or use start_location
-        location = activity.get("start_location", "")
-        
-        # Initialize day if not exists
-        if date_str not in days_dict:
-            days_dict[date_str] = {
-                "date": date_str,
-                "location": location,
-                "activities": []
-            }
+        day = days_dict.get(date_str)
+        if day is None:
+            # Get location from the day's earliest activity
+            day = days_dict[date_str] = _Day(date_str, activity.get("start_location", ""), [])
         
-        # Transform and add activity
-        transformed_activity = transform_activity_to_frontend_format(activity)
-        days_dict[date_str]["activities"].append(transformed_activity)
-    
-    # Convert to list and add day IDs
-    days_list = []
-    for idx, (date_str, day_data) in enumerate(sorted(days_dict.items()), 1):
-        days_list.append({
+        day.activities.append(transform_activity_to_frontend_format(activity))
+    
+    return [
+        {
             "id": idx,
-            "date": day_data["date"],
-            "location": day_data["location"],
-            "description": f"Day {idx} in {day_data['location']}",
-            "activities": day_data["activities"]
-        })
+            "date": day.date,
+            "location": day.location,
+            "description": f"Day {idx} in {day.location}",
+            "activities": day.activities
+        }
+        for idx, day in enumerate(days_dict.values(), 1)
+    ]
+
+
+class _ActivityStreamScanner:
+    """
+    Incrementally scan streamed Trip JSON for completed top-level activities.
+    
+    Tracks string/escape state and nesting depth across chunks, and returns
+    each element of the top-level "activities" array as soon as its closing
+    brace arrives, so activities can be sent on before the trip is complete.
+    """
+    
+    def __init__(self):
+        # Only the text a later chunk may still need: the activity being read
+        # or an unfinished top-level string. Offsets below are relative to it.
+        self._text = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._key = None
+        self._in_activities = False
+        self._element_start = -1
     
-    return days_list
+    def feed(self, chunk: str) -> List[dict]:
+        """Add a chunk of output text and return the activities it completed."""
+        text = self._text + chunk
+        completed = []
+        
+        for i in range(len(self._text), len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start:i]
+                continue
+            
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch == ':' and self._depth == 1:
+                # The last string read at the top level is this value's key
+                self._key = self._last_string
+            elif ch == '{' or ch == '[':
+                self._depth += 1
+                if self._depth == 2 and ch == '[' and self._key == "activities":
+                    self._in_activities = True
+                elif self._depth == 3 and self._in_activities and ch == '{':
+                    self._element_start = i
+            elif ch == '}' or ch == ']':
+                if self._depth == 3 and self._in_activities and ch == '}':
+                    completed.append(orjson.loads(text[self._element_start:i + 1]))
+                    self._element_start = -1
+                elif self._depth == 2 and self._in_activities:
+                    self._in_activities = False
+                self._depth -= 1
+        
+        # Drop everything already consumed so long outputs are not re-copied
+        # on every delta, and rebase the offsets into the kept tail
+        keep = len(text)
+        if self._element_start >= 0:
+            keep = self._element_start
+        if self._in_string and self._depth == 1:
+            keep = min(keep, self._string_start)
+        self._text = text[keep:]
+        if self._element_start >= 0:
+            self._element_start -= keep
+        if self._in_string:
+            self._string_start -= keep
+        return completed
+
+
+def _brainstorm_messages(query: str, old_plan_json: dict, is_initial: bool) -> List[dict]:
+    """Build the brainstorm prompt messages."""
+    # Order messages from most to least stable so repeated calls share a
+    # prefix the provider can cache: system prompt, then the old trip (for
+    # iterations), and the user's new query last.
+    messages = [{"role": "system", "content": BRAINSTORM_SYSTEM_PROMPT}]
+    if not is_initial:
+        # Iteration on existing plan - serialize old_plan_json with datetime handling
+        old_trip_json = _dumps_for_prompt(old_plan_json)
+        messages.append({"role": "user", "content": "Old trip\n\n" + old_trip_json})
+    messages.append({"role": "user", "content": query})
+    return messages
 
 
-def brainstorm_chat(query: str, old_plan_json: dict):
+async def brainstorm_chat(query: str, old_plan_json: dict):
     """
     Generate or iterate on trip plan using Azure OpenAI.
     
@@ -188,46 +367,163 @@ def brainstorm_chat(query: str, old_plan_json: dict):
         Dictionary with 'days' (list of day objects) and 'trip_summary' (string)
     """
     # Check if this is initial generation or iteration
-    is_initial = not old_plan_json or (isinstance(old_plan_json, dict) and not old_plan_json) or (isinstance(old_plan_json, list) and len(old_plan_json) == 0)
+    # Empty dict, empty list and None all mean there is no plan yet
+    is_initial = not old_plan_json
     
-    if is_initial:
-        # Initial trip generation - just use the query
-        prompt = query
-    else:
-        # Iteration on existing plan - serialize old_plan_json with datetime handling
-        # Use default=str to handle datetime objects in JSON serialization
-        old_trip_json = json.dumps(old_plan_json, default=str)
-        prompt = query + "\n\nOld trip\n\n" + old_trip_json
-
-    # Initialize Azure OpenAI client with credentials from environment variables
-    client = AzureOpenAI()
     model = 'gpt-4.1'
-    autotuning_res = client.responses.parse(
+    
+    # Identical initial queries are served from the response cache
+    cache_key = _prompt_cache_key(model, BRAINSTORM_SYSTEM_PROMPT, query) if is_initial else None
+    if cache_key is not None and cache_key in _response_cache:
+        return copy.deepcopy(_response_cache[cache_key])
+    
+    autotuning_res = await _get_client().responses.parse(
         model=model,
-        input=[
-            {
-                "role": "system",
-                "content": "You are a helpful assistant and a expert trip planner",
-            },
-            {"role": "user", "content": prompt},
-        ],
+        input=_brainstorm_messages(query, old_plan_json, is_initial),
         text_format=Trip,
     )
-    # Use mode='json' to properly serialize datetime objects to ISO format strings
-    trip_data = autotuning_res.output_parsed.model_dump(mode='json')
+    trip_data = _trip_to_dict(autotuning_res.output_parsed)
     
     # Transform trip data to days format
     days = transform_trip_to_days(trip_data)
     
-    return {
+    result = {
         "days": days,
         "trip_summary": trip_data.get("trip_summary", "")
     }
+    if cache_key is not None:
+        _cache_response(cache_key, result)
+    
+    return result
+
+async def stream_brainstorm_chat(query: str, old_plan_json: dict) -> AsyncIterator[dict]:
+    """
+    Streaming variant of brainstorm_chat.
+    
+    Yields {"type": "activity", "activity": ...} events (frontend format) as
+    each top-level activity and its sub-activities finish generating, then a
+    final {"type": "done", "days": [...], "trip_summary": ...} event built
+    from the fully validated Trip, which replaces the streamed activities.
+    
+    Args:
+        query: User's trip planning query
+        old_plan_json: Dictionary containing old plan data (empty dict {} for initial generation)
+    
+    Yields:
+        Event dictionaries, ending with the "done" event
+    """
+    is_initial = not old_plan_json
+    
+    model = 'gpt-4.1'
+    
+    cache_key = _prompt_cache_key(model, BRAINSTORM_SYSTEM_PROMPT, query) if is_initial else None
+    if cache_key is not None and cache_key in _response_cache:
+        yield {"type": "done", **copy.deepcopy(_response_cache[cache_key])}
+        return
+    
+    scanner = _ActivityStreamScanner()
+    async with _get_client().responses.stream(
+        model=model,
+        input=_brainstorm_messages(query, old_plan_json, is_initial),
+        text_format=Trip,
+    ) as stream:
+        async for event in stream:
+            if event.type != "response.output_text.delta":
+                continue
+            for activity in scanner.feed(event.delta):
+                for flat_activity in flatten_activities([activity]):
+                    yield {
+                        "type": "activity",
+                        "activity": transform_activity_to_frontend_format(flat_activity)
+                    }
+        final_response = await stream.get_final_response()
+    
+    trip_data = _trip_to_dict(final_response.output_parsed)
+    result = {
+        "days": transform_trip_to_days(trip_data),
+        "trip_summary": trip_data.get("trip_summary", "")
+    }
+    if cache_key is not None:
+        _cache_response(cache_key, result)
+    
+    yield {"type": "done", **result}
+
 
-def create_final_plan(old_plans: List[List[dict]], poll_results: dict):
+async def summarise_plan(plan: List[dict]) -> str:
+    """
+    Condense a single trip suggestion into a compact text outline.
+    
+    Args:
+        plan: Trip plan array (array of VibecationDay objects)
+    
+    Returns:
+        Outline of the plan as plain text
+    """
+    model = 'gpt-4.1'
+    res = await _get_client().responses.create(
+        model=model,
+        input=[
+            {"role": "system", "content": PLAN_SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": _dumps_for_prompt(plan)},
+        ],
+    )
+    return res.output_text
+
+
+def _merge_poll_entries(entries: List[dict], key) -> List[dict]:
+    """
+    Merge poll entries that share a key, summing their votes.
+    
+    Args:
+        entries: Poll entries with optional 'upvotes'/'downvotes' counts
+        key: Function returning the identity of an entry, e.g. (name, type)
+    
+    Returns:
+        One entry per key, sorted by net score (highest first)
+    """
+    merged = {}
+    for entry in entries:
+        entry_key = key(entry)
+        existing = merged.get(entry_key)
+        if existing is None:
+            merged[entry_key] = {
+                **entry,
+                "upvotes": entry.get("upvotes", 0),
+                "downvotes": entry.get("downvotes", 0)
+            }
+        else:
+            existing["upvotes"] += entry.get("upvotes", 0)
+            existing["downvotes"] += entry.get("downvotes", 0)
+    return sorted(merged.values(), key=lambda entry: entry["upvotes"] - entry["downvotes"], reverse=True)
+
+
+def _merge_cuisines(cuisines: list) -> list:
+    """Merge repeated cuisines (dicts by name with summed votes, strings by value); most voted first."""
+    votes_by_name = {}
+    plain = {}
+    for cuisine in cuisines:
+        if isinstance(cuisine, dict):
+            name = cuisine.get("name", "")
+            votes = cuisine.get("votes", cuisine.get("upvotes", 0))
+            votes_by_name[name] = votes_by_name.get(name, 0) + votes
+        else:
+            plain[cuisine] = None
+    merged = [
+        {"name": name, "votes": votes}
+        for name, votes in sorted(votes_by_name.items(), key=lambda item: item[1], reverse=True)
+    ]
+    merged.extend(cuisine for cuisine in plain if cuisine not in votes_by_name)
+    return merged
+
+
+async def create_final_plan(old_plans: List[List[dict]], poll_results: dict):
     """
     Create a final trip plan by merging multiple trip suggestions and incorporating poll results.
     
+    With more than one suggestion, each plan is first condensed by its own LLM
+    call; the calls run concurrently, so the extra latency is that of the
+    slowest plan rather than the sum, and the merge prompt stays small.
+    
     Args:
         old_plans: List of trip plan arrays (each plan is an array of VibecationDay objects)
         poll_results: Dictionary containing poll results with keys:
@@ -238,30 +534,18 @@ def create_final_plan(old_plans: List[List[dict]], poll_results: dict):
     Returns:
         Dictionary with 'days' (list of day objects) and 'trip_summary' (string)
     """
-    # Build prompt that includes all plans and poll results
-    prompt_parts = []
-    
-    # Add information about multiple plans
-    prompt_parts.append("I have multiple trip suggestions from different users. Please create a final unified trip plan that:")
-    prompt_parts.append("1. Merges the best elements from all suggestions")
-    prompt_parts.append("2. Incorporates the poll results (activities, locations, and cuisines that received the most votes)")
-    prompt_parts.append("3. Creates a cohesive, well-structured itinerary")
-    prompt_parts.append("\n")
-    
-    # Add all the plans
-    prompt_parts.append("Here are the trip suggestions:")
-    for idx, plan in enumerate(old_plans, 1):
-        prompt_parts.append(f"\n--- Suggestion {idx} ---")
-        plan_json = json.dumps(plan, default=str)
-        prompt_parts.append(plan_json)
-    
-    # Add poll results
-    prompt_parts.append("\n\n--- Poll Results ---")
+    # Add poll results. The same option can appear once per suggestion, so
+    # repeated entries are merged (votes summed) and listed most popular first.
+    prompt_parts = ["--- Poll Results ---"]
     
     # Add activities with vote counts
     if poll_results.get("activities"):
         prompt_parts.append("\nPopular Activities (based on votes):")
-        for activity in poll_results["activities"]:
+        activities = _merge_poll_entries(
+            poll_results["activities"],
+            lambda activity: (activity.get("activity_name", activity.get("name", "")), activity.get("type", ""))
+        )
+        for activity in activities:
             upvotes = activity.get("upvotes", 0)
             downvotes = activity.get("downvotes", 0)
             net_score = upvotes - downvotes
@@ -273,7 +557,11 @@ def create_final_plan(old_plans: List[List[dict]], poll_results: dict):
     # Add locations with vote counts
     if poll_results.get("locations"):
         prompt_parts.append("\nPopular Locations (based on votes):")
-        for location in poll_results["locations"]:
+        locations = _merge_poll_entries(
+            poll_results["locations"],
+            lambda location: (location.get("name", ""), location.get("type", ""))
+        )
+        for location in locations:
             upvotes = location.get("upvotes", 0)
             downvotes = location.get("downvotes", 0)
             net_score = upvotes - downvotes
@@ -284,37 +572,46 @@ def create_final_plan(old_plans: List[List[dict]], poll_results: dict):
     # Add cuisines
     if poll_results.get("cuisines"):
         prompt_parts.append("\nPreferred Cuisines (based on votes):")
-        for cuisine in poll_results["cuisines"]:
+        for cuisine in _merge_cuisines(poll_results["cuisines"]):
             if isinstance(cuisine, dict):
-                cuisine_name = cuisine.get("name", "")
-                votes = cuisine.get("votes", cuisine.get("upvotes", 0))
-                prompt_parts.append(f"- {cuisine_name} [Votes: {votes}]")
+                prompt_parts.append(f"- {cuisine['name']} [Votes: {cuisine['votes']}]")
             else:
                 prompt_parts.append(f"- {cuisine}")
     
     prompt_parts.append("\n\nPlease create a final unified trip plan that incorporates the most popular elements from the polls while maintaining a logical flow and structure.")
     
-    # Combine all prompt parts
-    prompt = "\n".join(prompt_parts)
+    poll_prompt = "\n".join(prompt_parts)
     
-    # Initialize Azure OpenAI client
-    client = AzureOpenAI()
     model = 'gpt-4.1'
     
     try:
-        autotuning_res = client.responses.parse(
+        if len(old_plans) > 1:
+            plan_texts = await asyncio.gather(*(summarise_plan(plan) for plan in old_plans))
+        else:
+            plan_texts = [_dumps_for_prompt(plan) for plan in old_plans]
+        
+        # The prompt is split into two user messages: the instructions and the
+        # suggestions stay identical while members vote, so they form a stable,
+        # cacheable prefix; the poll results change and come last.
+        plan_parts = [FINAL_PLAN_INSTRUCTIONS]
+        
+        # Add all the plans
+        plan_parts.append("Here are the trip suggestions:")
+        for idx, plan_text in enumerate(plan_texts, 1):
+            plan_parts.append(f"\n--- Suggestion {idx} ---")
+            plan_parts.append(plan_text)
+        plans_prompt = "\n".join(plan_parts)
+        
+        autotuning_res = await _get_client().responses.parse(
             model=model,
             input=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant and an expert trip planner. Your task is to merge multiple trip suggestions into one cohesive final plan, prioritizing activities, locations, and cuisines that received the most votes in polls.",
-                },
-                {"role": "user", "content": prompt},
+                {"role": "system", "content": FINAL_PLAN_SYSTEM_PROMPT},
+                {"role": "user", "content": plans_prompt},
+                {"role": "user", "content": poll_prompt},
             ],
             text_format=Trip,
         )
-        # Use mode='json' to properly serialize datetime objects to ISO format strings
-        trip_data = autotuning_res.output_parsed.model_dump(mode='json')
+        trip_data = _trip_to_dict(autotuning_res.output_parsed)
         
         # Transform trip data to days format
         days = transform_trip_to_days(trip_data)
@@ -339,6 +636,10 @@ def create_final_plan(old_plans: List[List[dict]], poll_results: dict):
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    
+    # Load environment variables from .env file when run as a script
+    load_dotenv()
     query = "I want to go to the Greece for 10 days"
     old_plan_json = {}
-    print(json.dumps(brainstorm_chat(query, old_plan_json), indent=4, default=str))
\ No newline at end of file
+    print(json.dumps(asyncio.run(brainstorm_chat(query, old_plan_json)), indent=4, default=str))
\ No newline at end of file
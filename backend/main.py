@@ -1,25 +1,57 @@
 """
 FastAPI backend for Vibecation travel planner application.
 """
-from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr, Field
-from pydantic import field_validator
 from typing import List, Optional, Dict
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import bcrypt
 import json
 import hashlib
-from motor.motor_asyncio import AsyncIOMotorClient
+import orjson
+from pymongo import AsyncMongoClient, ReturnDocument, WriteConcern
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+import redis.asyncio as redis
 import os
 import secrets
 import string
+import time
 from contextlib import asynccontextmanager
-from brainstormchat import brainstorm_chat, create_final_plan
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables from .env file once, before anything reads them
+load_dotenv(override=False)
+
+from brainstormchat import brainstorm_chat, create_final_plan, stream_brainstorm_chat
 
 # Database connection
-client: Optional[AsyncIOMotorClient] = None
+client: Optional[AsyncMongoClient] = None
 db = None
+# Handle on the votes collection used for vote writes, acknowledged by the
+# primary alone without waiting for replication or the journal
+vote_writes = None
+
+# Dedicated threads for bcrypt, which releases the GIL while hashing
+bcrypt_pool: Optional[ThreadPoolExecutor] = None
+
+# bcrypt cost factor; each +1 doubles hashing time (production sets 12)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+BCRYPT_HASH_LENGTH = 60
+# Seconds one bcrypt check of the costliest stored hash takes on this
+# machine, measured at startup
+bcrypt_check_seconds = 0.1
+
+# Optional Redis cache for read-heavy endpoints, enabled when REDIS_URL is set
+redis_client: Optional[redis.Redis] = None
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+
+# In-progress loads by cache key, shared by concurrent requests for the same key
+_inflight: Dict[str, asyncio.Task] = {}
 
 # WebSocket connection manager for chat
 class ConnectionManager:
@@ -57,33 +89,264 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def get_mongo_client() -> AsyncMongoClient:
+    """Return the process-wide MongoDB client, creating it on first use."""
+    global client
+    if client is None:
+        mongodb_url = os.getenv("MONGODB_URL", "mongodb://mongodb:27017")
+        client = AsyncMongoClient(
+            mongodb_url,
+            appname="vibecation",
+            # Sized so a burst of concurrent votes does not queue behind a few
+            # sockets; minPoolSize keeps warm connections open between bursts
+            maxPoolSize=100,
+            minPoolSize=20,
+            maxIdleTimeMS=30000,
+            # Fail a request that cannot get a connection instead of hanging
+            waitQueueTimeoutMS=2000,
+            serverSelectionTimeoutMS=3000,
+            retryWrites=True,
+            # Wire compression; the server picks the first one it supports
+            compressors="zstd,zlib",
+            uuidRepresentation="standard",
+            # Timestamps are written as aware UTC datetimes; read them back the same way
+            tz_aware=True
+        )
+    return client
+
+# (collection, keys, options) for every index the API's lookups rely on
+INDEXES = [
+    ("users", "userID", {"unique": True}),
+    ("users", "username", {"unique": True}),
+    ("users", "email", {"unique": True}),
+    ("users", [("username", 1), ("isActive", 1)], {}),
+    ("trips", "tripID", {"unique": True}),
+    # Sparse: trips created before invite codes existed have none yet (empty
+    # or null legacy codes are unset by unset_empty_invite_codes first)
+    ("trips", "inviteCode", {"unique": True, "sparse": True}),
+    ("trips", "ownerID", {}),
+    ("trips", "members", {}),
+    ("votes", [("tripID", 1), ("voteType", 1), ("optionID", 1)], {}),
+    # One vote per user per option; vote upserts rely on it
+    ("votes", [("tripID", 1), ("userID", 1), ("optionID", 1), ("voteType", 1)], {"unique": True}),
+    ("trip_suggestions", "tripSuggestionID", {"unique": True}),
+    # Submitted suggestions per trip, and who submitted them
+    ("trip_suggestions", [("tripID", 1), ("status", 1), ("userID", 1)], {}),
+    ("polling_completion", [("tripID", 1), ("userID", 1)], {}),
+    ("chat_messages", [("tripID", 1), ("createdAt", -1)], {}),
+    ("brainstorm_jobs", "jobID", {"unique": True}),
+    # Finished jobs are only polled briefly; expire them after a day
+    ("brainstorm_jobs", "createdAt", {"expireAfterSeconds": 86400}),
+]
+
+async def ensure_indexes():
+    """
+    Create the indexes the API's lookups rely on.
+    
+    create_index is a no-op for indexes that already exist (e.g. from
+    init-mongo.js), so this is safe to run on every startup. Each index is
+    created on its own, so one failure (e.g. legacy duplicates blocking a
+    unique index) is logged without skipping the rest.
+    """
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except Exception as e:
+            print(f"Error creating index {keys} on {collection}: {e}")
+
+async def unset_empty_invite_codes():
+    """
+    Unset empty-string or null invite codes left by older trips.
+    
+    The sparse unique index still indexes those values, so two such trips
+    would block building it; unset, they are backfilled by get_invite_code.
+    """
+    result = await db.trips.update_many(
+        {"inviteCode": {"$in": [None, ""], "$exists": True}},
+        {"$unset": {"inviteCode": ""}}
+    )
+    if result.modified_count:
+        print(f"Unset {result.modified_count} empty invite code(s)")
+
+async def cache_get(key: str):
+    """Return a cached value's JSON bytes, or None on a miss or when caching is disabled."""
+    if redis_client is None:
+        return None
+    try:
+        raw = await redis_client.get(key)
+    except Exception as e:
+        print(f"Error reading cache key {key}: {e}")
+        return None
+    return raw
+
+async def cache_set(key: str, body: bytes, ttl: int = CACHE_TTL_SECONDS):
+    """
+    Cache orjson-encoded bytes for ttl seconds (no-op when caching is disabled).
+    
+    Values are stored already encoded so a hit can be sent as the response
+    body without decoding and re-encoding it.
+    """
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(key, body, ex=ttl)
+    except Exception as e:
+        print(f"Error writing cache key {key}: {e}")
+
+# Sets a key only while its generation is still the one read before loading
+CACHE_SET_IF_CURRENT_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[2] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+end
+"""
+
+async def cache_generation(key: str) -> Optional[bytes]:
+    """
+    Return key's current generation, to pass to cache_set_if_current.
+    
+    Read it before loading the value from Mongo. None when caching is
+    disabled or Redis cannot be reached, in which case nothing is cached.
+    """
+    if redis_client is None:
+        return None
+    try:
+        return await redis_client.get(f"gen:{key}") or b"0"
+    except Exception as e:
+        print(f"Error reading cache generation of {key}: {e}")
+        return None
+
+async def cache_set_if_current(key: str, body: bytes, generation: Optional[bytes], ttl: int = CACHE_TTL_SECONDS):
+    """
+    Cache body like cache_set, unless key was invalidated since generation was read.
+    
+    A load that was already reading Mongo when a write called cache_delete
+    would otherwise cache its old snapshot for the full TTL.
+    """
+    if redis_client is None or generation is None:
+        return
+    try:
+        await redis_client.eval(CACHE_SET_IF_CURRENT_LUA, 2, key, f"gen:{key}", body, generation, ttl)
+    except Exception as e:
+        print(f"Error writing cache key {key}: {e}")
+
+async def cache_delete(*keys: str):
+    """Invalidate cached values and bump their generations (no-op when caching is disabled)."""
+    # Later readers in this process must not join a load that started before the write
+    for key in keys:
+        _inflight.pop(key, None)
+    if redis_client is None or not keys:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            for key in keys:
+                # Generations only need to outlive loads in flight
+                pipe.incr(f"gen:{key}")
+                pipe.expire(f"gen:{key}", CACHE_TTL_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        print(f"Error deleting cache keys {keys}: {e}")
+
+async def single_flight(key: str, load):
+    """
+    Run load() at most once at a time per key; concurrent callers await the same result.
+    
+    On a cache miss only the first request queries Mongo and the rest share
+    its result (or exception) instead of stampeding the database.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(load())
+        _inflight[key] = task
+        # Only clear the entry if cache_delete has not replaced it since
+        task.add_done_callback(lambda done: _inflight.pop(key) if _inflight.get(key) is done else None)
+    # Shield so one caller disconnecting does not cancel the load for the others
+    return await asyncio.shield(task)
+
+def etag_response(request: Request, content, cache_control: str = "private, max-age=30") -> Response:
+    """
+    Return content as JSON with a weak content-hash ETag.
+    
+    content may already be encoded JSON bytes (e.g. a cache hit), which are
+    sent as they are. Answers 304 Not Modified (no body) when the client's If-None-Match
+    already carries the same ETag.
+    """
+    body = content if isinstance(content, bytes) else orjson.dumps(content)
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for database connection."""
-    global client, db
-    mongodb_url = os.getenv("MONGODB_URL", "mongodb://mongodb:27017")
-    client = AsyncIOMotorClient(mongodb_url)
-    db = client.vibecation
+    global client, db, vote_writes, bcrypt_pool, redis_client, bcrypt_check_seconds
+    db = get_mongo_client().vibecation
+    vote_writes = db.get_collection("votes", write_concern=WriteConcern(w=1, j=False))
+    try:
+        # Connect up front so the first requests do not pay for the handshake
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"Error connecting to MongoDB: {e}")
+    try:
+        await unset_empty_invite_codes()
+    except Exception as e:
+        print(f"Error unsetting empty invite codes: {e}")
+    await ensure_indexes()
+    try:
+        await fail_stale_brainstorm_jobs()
+    except Exception as e:
+        print(f"Error failing stale brainstorm jobs: {e}")
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        redis_client = redis.from_url(redis_url)
+    bcrypt_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt")
+    # Time one hash so the configured cost can be checked against this machine
+    started = time.perf_counter()
+    await hash_password("bcrypt-calibration")
+    hash_seconds = time.perf_counter() - started
+    print(f"bcrypt {bcrypt.__version__} cost {BCRYPT_ROUNDS}: {hash_seconds * 1000:.0f} ms per hash")
+    # Unknown-user logins must take as long as checking the costliest stored
+    # hash (e.g. cost-12 hashes under a lower default); each +1 doubles the time
+    try:
+        stored_cost = await highest_stored_bcrypt_cost()
+    except Exception as e:
+        print(f"Error reading stored bcrypt costs: {e}")
+        stored_cost = BCRYPT_ROUNDS
+    bcrypt_check_seconds = hash_seconds * 2 ** (stored_cost - BCRYPT_ROUNDS)
     yield
     if client:
-        client.close()
+        await client.close()
+        client = None
+    bcrypt_pool.shutdown(wait=False)
+    bcrypt_pool = None
+    if redis_client:
+        await redis_client.aclose()
+        redis_client = None
 
 app = FastAPI(
     title="Vibecation API",
     description="API for planning and managing travel itineraries",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
-# Allow origins from environment variable or default to localhost
-cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://frontend:3000").split(",")
+# Allow origins from environment variable or default to localhost; a set makes
+# the per-request origin check a hash lookup
+cors_origins = frozenset(
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://frontend:3000").split(",")
+    if origin.strip()
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 # Pydantic models
@@ -92,13 +355,6 @@ class UserCreate(BaseModel):
     email: EmailStr
     name: str = Field(..., min_length=2, max_length=100)
     password: str = Field(..., min_length=2)
-    
-    @field_validator('password')
-    @classmethod
-    def validate_password(cls, v):
-        if len(v) < 2:
-            raise ValueError('Password must be at least 2 characters')
-        return v
 
 class UserResponse(BaseModel):
     userID: str
@@ -106,6 +362,10 @@ class UserResponse(BaseModel):
     email: str
     name: str
 
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
 class LoginResponse(BaseModel):
     userID: str
 
@@ -132,6 +392,13 @@ class TripInfoResponse(BaseModel):
 class DashboardResponse(BaseModel):
     yourTrips: List[str]
 
+class BrainstormJobCreate(BaseModel):
+    tripID: str
+    userID: str
+    tripSuggestionID: str
+    query: str
+    old_plan: str = "{}"
+
 class CreateFinalPlanRequest(BaseModel):
     tripID: str
     userID: str
@@ -337,37 +604,68 @@ class TripDetailsItinerary(BaseModel):
     trip_summary: Optional[str] = None
 
 # Helper functions
-async def get_next_id(collection_name: str) -> str:
-    """Generate next sequential ID for a collection."""
-    counter_collection = db.id_counters
-    result = await counter_collection.find_one_and_update(
-        {"_id": collection_name},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True
-    )
-    seq = result.get("seq", 1)
-    prefix = collection_name.replace("users", "user").replace("trips", "trip")
-    return f"{prefix}_{str(seq).zfill(3)}"
+def generate_id(prefix: str) -> str:
+    """Generate a unique ID such as "user_<ObjectId>" without a database round-trip."""
+    return f"{prefix}_{ObjectId()}"
 
-async def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    salt = bcrypt.gensalt(rounds=12)
+def _hash_password_sync(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
-async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash."""
+def bcrypt_cost(password_hash: str) -> int:
+    """Cost factor a bcrypt hash was created with ("$2b$12$..." -> 12)."""
+    return int(password_hash[4:6])
+
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-async def generate_invite_code() -> str:
-    """Generate a unique invite code (8 characters, alphanumeric uppercase)."""
-    alphabet = string.ascii_uppercase + string.digits
-    while True:
-        code = ''.join(secrets.choice(alphabet) for _ in range(8))
-        # Check if code already exists
-        existing = await db.trips.find_one({"inviteCode": code})
-        if not existing:
-            return code
+async def highest_stored_bcrypt_cost() -> int:
+    """Highest cost factor among the stored password hashes (BCRYPT_ROUNDS if none is higher)."""
+    cursor = await db.users.aggregate([
+        {"$match": {"passwordHash": {"$regex": r"^\$2[abxy]\$\d\d\$"}}},
+        {"$group": {"_id": None, "cost": {"$max": {"$substrBytes": ["$passwordHash", 4, 2]}}}}
+    ])
+    async for doc in cursor:
+        # Two-digit costs compare correctly as strings
+        return max(int(doc["cost"]), BCRYPT_ROUNDS)
+    return BCRYPT_ROUNDS
+
+async def hash_password(password: str) -> str:
+    """Hash a password using bcrypt, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_pool, _hash_password_sync, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_pool, _verify_password_sync, plain_password, hashed_password)
+
+INVITE_CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+def generate_invite_code() -> str:
+    """
+    Generate a random invite code (8 characters, alphanumeric uppercase).
+    
+    Uniqueness is enforced by the unique inviteCode index: writers retry
+    with a new code on DuplicateKeyError instead of checking first.
+    """
+    # One random draw covering all 36^8 codes, rendered in base 36, instead
+    # of a separate secrets.choice() per character
+    value = secrets.randbelow(36 ** 8)
+    chars = []
+    for _ in range(8):
+        value, index = divmod(value, 36)
+        chars.append(INVITE_CODE_ALPHABET[index])
+    return ''.join(chars)
+
+def is_trip_member(user_id: str, trip: dict) -> bool:
+    """Check if user is the trip owner or in its members list."""
+    owner = trip.get("ownerID")
+    return (owner is not None and user_id == owner) or user_id in trip.get("members", [])
+
+def is_duplicate_of(error: DuplicateKeyError, field: str) -> bool:
+    """Whether a DuplicateKeyError was raised by the unique index on field."""
+    return field in (error.details or {}).get("keyPattern", {})
 
 # API Endpoints
 
@@ -376,72 +674,82 @@ async def root():
     """Root endpoint."""
     return {"message": "Vibecation API", "version": "1.0.0"}
 
-@app.get("/login", response_model=LoginResponse)
-async def login(
-    username: str = Query(...),
-    password: str = Query(...)
-):
+@app.post("/login", response_model=LoginResponse)
+async def login(credentials: LoginRequest):
     """User login endpoint."""
-    user = await db.users.find_one({"username": username, "isActive": True})
+    # Fetch the user and stamp the login attempt in one round-trip
+    user = await db.users.find_one_and_update(
+        {"username": credentials.username, "isActive": True},
+        {"$currentDate": {"lastLoginAt": True}},
+        projection={"userID": 1, "passwordHash": 1, "_id": 0}
+    )
     
-    if not user:
+    password_hash = (user.get("passwordHash") or "") if user else ""
+    if len(password_hash) != BCRYPT_HASH_LENGTH:
+        # Unknown user or no usable hash: fail without spending bcrypt CPU, but
+        # only after about as long as a real check so the two are indistinguishable
+        await asyncio.sleep(bcrypt_check_seconds)
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not await verify_password(password, user.get("passwordHash", "")):
+    try:
+        valid = await verify_password(credentials.password, password_hash)
+    except ValueError:
+        # A 60-character value that is not a bcrypt hash (e.g. bad salt)
+        valid = False
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Update last login
-    await db.users.update_one(
-        {"userID": user["userID"]},
-        {"$set": {"lastLoginAt": datetime.utcnow()}}
-    )
+    # Hashes made under a lower BCRYPT_ROUNDS are upgraded while the plain
+    # password is at hand; stronger hashes are never weakened
+    if bcrypt_cost(password_hash) < BCRYPT_ROUNDS:
+        await db.users.update_one(
+            {"userID": user["userID"], "passwordHash": password_hash},
+            {"$set": {"passwordHash": await hash_password(credentials.password)}}
+        )
     
-    return LoginResponse(userID=user["userID"])
+    return LoginResponse.model_construct(userID=user["userID"])
 
 @app.post("/users", response_model=UserResponse, status_code=201)
 async def create_user(user_data: UserCreate):
     """Create a new user account."""
-    # Check if username or email already exists
-    existing_user = await db.users.find_one({
-        "$or": [
-            {"username": user_data.username},
-            {"email": user_data.email}
-        ]
-    })
-    
-    if existing_user:
-        if existing_user.get("username") == user_data.username:
-            raise HTTPException(
-                status_code=409,
-                detail={"error": "Username already exists", "field": "username"}
-            )
-        if existing_user.get("email") == user_data.email:
-            raise HTTPException(
-                status_code=409,
-                detail={"error": "Email already registered", "field": "email"}
-            )
-    
     # Generate user ID
-    user_id = await get_next_id("users")
+    user_id = generate_id("user")
     
     # Hash password
     password_hash = await hash_password(user_data.password)
     
     # Create user document
+    now = datetime.now(timezone.utc)
     user_doc = {
         "userID": user_id,
         "username": user_data.username,
         "email": user_data.email,
         "name": user_data.name,
         "passwordHash": password_hash,
-        "createdAt": datetime.utcnow(),
-        "updatedAt": datetime.utcnow(),
+        "createdAt": now,
+        "updatedAt": now,
         "isActive": True
     }
     
-    await db.users.insert_one(user_doc)
+    # The unique username/email indexes reject duplicates, so no lookup is
+    # needed beforehand (and concurrent signups cannot both succeed)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError as e:
+        if is_duplicate_of(e, "username"):
+            raise HTTPException(
+                status_code=409,
+                detail={"error": "Username already exists", "field": "username"}
+            )
+        if is_duplicate_of(e, "email"):
+            raise HTTPException(
+                status_code=409,
+                detail={"error": "Email already registered", "field": "email"}
+            )
+        raise
     
-    return UserResponse(
+    # user_data was validated on the way in
+    return UserResponse.model_construct(
         userID=user_id,
         username=user_data.username,
         email=user_data.email,
@@ -466,59 +774,97 @@ async def check_availability(
         query["email"] = email
         field = "email"
     
-    existing_user = await db.users.find_one(query)
+    # Only presence matters: the server stops at the first match and returns
+    # a count instead of the user document
+    taken = await db.users.count_documents(query, limit=1)
     
     return {
-        "available": existing_user is None,
+        "available": taken == 0,
         "field": field
     }
 
 @app.get("/users/{userID}", response_model=UserResponse)
-async def get_user(userID: str):
+async def get_user(userID: str, request: Request):
     """Get user profile information."""
-    user = await db.users.find_one({"userID": userID, "isActive": True})
+    cached = await cache_get(f"user:{userID}")
+    if cached is not None:
+        return etag_response(request, cached)
+    
+    user = await db.users.find_one(
+        {"userID": userID, "isActive": True},
+        {"userID": 1, "username": 1, "email": 1, "name": 1, "_id": 0}
+    )
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return UserResponse(
+    # Stored users were validated on creation, so skip re-validating them
+    response = UserResponse.model_construct(
         userID=user["userID"],
         username=user["username"],
         email=user["email"],
         name=user["name"]
     )
+    body = orjson.dumps(response.model_dump())
+    await cache_set(f"user:{userID}", body)
+    return etag_response(request, body)
 
 @app.get("/dashboard", response_model=DashboardResponse)
-async def get_dashboard(userID: str = Query(...)):
+async def get_dashboard(request: Request, userID: str = Query(...)):
     """Get user dashboard with all trips."""
-    # Find trips where user is owner or member
-    trips = await db.trips.find({
-        "$or": [
-            {"ownerID": userID},
-            {"members": userID}
-        ]
-    }).to_list(length=None)
-    
-    trip_ids = [trip["tripID"] for trip in trips]
-    
-    return DashboardResponse(yourTrips=trip_ids)
+    # Trips appear right after being created or joined, so browsers must
+    # revalidate every time (a matching ETag still skips the body)
+    cache_key = f"dash:{userID}"
+    content = await cache_get(cache_key)
+    if content is None:
+        content = await single_flight(cache_key, lambda: load_dashboard(userID))
+    return etag_response(request, content, cache_control="private, no-cache")
+
+async def load_dashboard(userID: str) -> bytes:
+    """Load a user's dashboard from Mongo, cache it and return its JSON bytes."""
+    cache_key = f"dash:{userID}"
+    generation = await cache_generation(cache_key)
+    # The owner is always stored in members, so one scan of the members
+    # index finds every trip the user owns or belongs to; distinct returns
+    # just the IDs in one reply, without building a document per trip
+    trip_ids = await db.trips.distinct("tripID", {"members": userID})
+    
+    body = orjson.dumps(DashboardResponse.model_construct(yourTrips=trip_ids).model_dump())
+    await cache_set_if_current(cache_key, body, generation)
+    return body
 
 @app.get("/tripinfo", response_model=TripInfoResponse)
-async def get_trip_info(tripID: str = Query(...)):
+async def get_trip_info(request: Request, tripID: str = Query(...)):
     """Get trip information."""
     if db is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     
-    trip = await db.trips.find_one({"tripID": tripID})
+    # Members change as people join, so browsers must revalidate every time
+    cache_key = f"trip:{tripID}"
+    content = await cache_get(cache_key)
+    if content is None:
+        content = await single_flight(cache_key, lambda: load_trip_info(tripID))
+    return etag_response(request, content, cache_control="private, no-cache")
+
+async def load_trip_info(tripID: str) -> bytes:
+    """Load a trip's info from Mongo, cache it and return its JSON bytes."""
+    cache_key = f"trip:{tripID}"
+    generation = await cache_generation(cache_key)
+    trip = await db.trips.find_one(
+        {"tripID": tripID},
+        {"title": 1, "members": 1, "description": 1, "_id": 0}
+    )
     
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    return TripInfoResponse(
+    body = orjson.dumps(TripInfoResponse.model_construct(
         title=trip.get("title", ""),
         members=trip.get("members", []),
         description=trip.get("description")
-    )
+    ).model_dump())
+    await cache_set_if_current(cache_key, body, generation)
+    return body
 
 @app.get("/check_brainstorm_completion")
 async def check_brainstorm_completion(tripID: str = Query(...)):
@@ -527,7 +873,7 @@ async def check_brainstorm_completion(tripID: str = Query(...)):
         raise HTTPException(status_code=503, detail="Database not connected")
     
     # Get trip info to get all members
-    trip = await db.trips.find_one({"tripID": tripID})
+    trip = await db.trips.find_one({"tripID": tripID}, {"members": 1, "_id": 0})
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
@@ -540,20 +886,19 @@ async def check_brainstorm_completion(tripID: str = Query(...)):
             "completedUserIDs": []
         }
     
-    # Get all submitted suggestions for this trip
-    submitted_suggestions = await db.trip_suggestions.find({
-        "tripID": tripID,
-        "status": "submitted"
-    }).to_list(length=100)
-    
-    completed_user_ids = [s["userID"] for s in submitted_suggestions]
-    completed_count = len(set(completed_user_ids))  # Use set to avoid duplicates
+    # Users with a submitted suggestion, deduplicated by the server straight
+    # from the (tripID, status, userID) index
+    completed_user_ids = await db.trip_suggestions.distinct(
+        "userID",
+        {"tripID": tripID, "status": "submitted"}
+    )
+    completed_count = len(completed_user_ids)
     
     return {
         "allCompleted": completed_count >= len(members),
         "totalMembers": len(members),
         "completedMembers": completed_count,
-        "completedUserIDs": list(set(completed_user_ids)),
+        "completedUserIDs": completed_user_ids,
         "allMemberIDs": members
     }
 
@@ -568,46 +913,15 @@ async def get_trip_overview(tripID: str):
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    # Get all votes for this trip
-    votes_collection = db.votes
-    all_votes = await votes_collection.find({
-        "tripID": tripID
-    }).to_list(length=10000)
-    
-    # Aggregate activity votes
-    activity_votes = {}
-    for vote in all_votes:
-        if vote.get("voteType") == "activity":
-            activity_id = vote.get("optionID")
-            if activity_id not in activity_votes:
-                activity_votes[activity_id] = {"upvotes": 0, "downvotes": 0}
-            if vote.get("vote", True):
-                activity_votes[activity_id]["upvotes"] += 1
-            else:
-                activity_votes[activity_id]["downvotes"] += 1
-    
-    # Aggregate location votes
-    location_votes = {}
-    for vote in all_votes:
-        if vote.get("voteType") == "location":
-            location_id = vote.get("optionID")
-            if location_id not in location_votes:
-                location_votes[location_id] = {"upvotes": 0, "downvotes": 0}
-            if vote.get("vote", True):
-                location_votes[location_id]["upvotes"] += 1
-            else:
-                location_votes[location_id]["downvotes"] += 1
-    
-    # Aggregate cuisine votes
-    cuisine_votes = {}
-    for vote in all_votes:
-        if vote.get("voteType") == "food_cuisine":
-            cuisine_name = vote.get("optionID") or vote.get("voteValue")
-            if cuisine_name:
-                if cuisine_name not in cuisine_votes:
-                    cuisine_votes[cuisine_name] = {"votes": 0}
-                if vote.get("vote", True):
-                    cuisine_votes[cuisine_name]["votes"] += 1
+    # Count votes per option on the server, all poll types in one aggregation
+    vote_counts = await count_trip_votes(tripID)
+    activity_votes = option_vote_counts(vote_counts, "activity")
+    location_votes = option_vote_counts(vote_counts, "location")
+    # A cuisine counts as chosen once per upvote
+    cuisine_votes = {
+        cuisine_name: {"votes": counts["upvotes"]}
+        for cuisine_name, counts in option_vote_counts(vote_counts, "food_cuisine").items()
+    }
     
     # Get all submitted suggestions for this trip
     suggestions = await db.trip_suggestions.find({
@@ -759,7 +1073,7 @@ async def get_trip_overview(tripID: str):
     )[:10]  # Top 10
     
     # Calculate total votes
-    total_votes = len(all_votes)
+    total_votes = sum(counts["total"] for counts in vote_counts.values())
     
     return {
         "trip": {
@@ -780,27 +1094,33 @@ async def get_trip_overview(tripID: str):
 async def create_trip(trip_data: TripCreate, userID: str = Query(...)):
     """Create a new trip."""
     # Generate trip ID if not provided
-    trip_id = trip_data.tripID or await get_next_id("trips")
-    
-    # Ensure creator is in members list
-    members = list(set([userID] + trip_data.members))
+    trip_id = trip_data.tripID or generate_id("trip")
     
-    # Generate unique invite code
-    invite_code = await generate_invite_code()
+    # Ensure creator is in members list (first), dropping duplicates in order
+    members = list(dict.fromkeys([userID, *trip_data.members]))
     
+    now = datetime.now(timezone.utc)
     trip_doc = {
         "tripID": trip_id,
         "title": trip_data.title,
         "description": trip_data.description or "",
         "ownerID": userID,
         "members": members,
-        "inviteCode": invite_code,
         "status": "planning",
-        "createdAt": datetime.utcnow(),
-        "updatedAt": datetime.utcnow()
+        "createdAt": now,
+        "updatedAt": now
     }
     
-    await db.trips.insert_one(trip_doc)
+    # Insert with a random invite code, drawing a new one on the rare collision
+    while True:
+        invite_code = trip_doc["inviteCode"] = generate_invite_code()
+        try:
+            await db.trips.insert_one(trip_doc)
+            break
+        except DuplicateKeyError as e:
+            if not is_duplicate_of(e, "inviteCode"):
+                raise
+    await cache_delete(f"trip:{trip_id}", *(f"dash:{member}" for member in members))
     
     return {
         "tripID": trip_id,
@@ -819,30 +1139,52 @@ async def get_trip(tripID: str):
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    return TripResponse(
+    now = datetime.now(timezone.utc)
+    return TripResponse.model_construct(
         tripID=trip["tripID"],
         title=trip.get("title", ""),
         description=trip.get("description"),
         members=trip.get("members", []),
         ownerID=trip.get("ownerID", ""),
-        createdAt=trip.get("createdAt", datetime.utcnow()),
-        updatedAt=trip.get("updatedAt", datetime.utcnow())
+        createdAt=trip.get("createdAt", now),
+        updatedAt=trip.get("updatedAt", now)
     )
 
 @app.delete("/trips/{tripID}", status_code=204)
 async def delete_trip(tripID: str):
     """Delete a trip."""
-    result = await db.trips.delete_one({"tripID": tripID})
+    trip = await db.trips.find_one_and_delete(
+        {"tripID": tripID},
+        projection={"ownerID": 1, "members": 1, "_id": 0}
+    )
     
-    if result.deleted_count == 0:
+    if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
+    affected_users = set(trip.get("members", [])) | {trip.get("ownerID")}
+    await cache_delete(
+        f"trip:{tripID}",
+        f"invite:{tripID}",
+        *(f"dash:{user_id}" for user_id in affected_users if user_id)
+    )
+    
     return None
 
 @app.get("/trips/{tripID}/invite-code")
 async def get_invite_code(tripID: str, userID: str = Query(...)):
     """Get invite code for a trip. Only owner can access."""
-    trip = await db.trips.find_one({"tripID": tripID})
+    # A trip's owner and invite code never change once set, so they are
+    # cached until the trip is deleted
+    cache_key = f"invite:{tripID}"
+    raw = await cache_get(cache_key)
+    cached = raw is not None
+    if cached:
+        trip = orjson.loads(raw)
+    else:
+        trip = await db.trips.find_one(
+            {"tripID": tripID},
+            {"ownerID": 1, "inviteCode": 1, "_id": 0}
+        )
     
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
@@ -852,13 +1194,33 @@ async def get_invite_code(tripID: str, userID: str = Query(...)):
         raise HTTPException(status_code=403, detail="Only trip owner can access invite code")
     
     invite_code = trip.get("inviteCode")
-    if not invite_code:
-        # Generate one if it doesn't exist (for backward compatibility)
-        invite_code = await generate_invite_code()
-        await db.trips.update_one(
-            {"tripID": tripID},
-            {"$set": {"inviteCode": invite_code, "updatedAt": datetime.utcnow()}}
-        )
+    while not invite_code:
+        # Generate one if it doesn't exist (for backward compatibility). It is
+        # only written while the trip still has none, so concurrent requests
+        # all end up returning the same code
+        try:
+            trip = await db.trips.find_one_and_update(
+                {"tripID": tripID, "inviteCode": {"$exists": False}},
+                {"$set": {"inviteCode": generate_invite_code(), "updatedAt": datetime.now(timezone.utc)}},
+                projection={"inviteCode": 1, "_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError as e:
+            if not is_duplicate_of(e, "inviteCode"):
+                raise
+            continue
+        if trip is None:
+            # Another request stored a code first
+            trip = await db.trips.find_one({"tripID": tripID}, {"inviteCode": 1, "_id": 0})
+            if not trip:
+                raise HTTPException(status_code=404, detail="Trip not found")
+            if not trip.get("inviteCode"):
+                # An empty legacy code that unset_empty_invite_codes has not unset
+                raise HTTPException(status_code=500, detail="Trip has an invalid invite code")
+        invite_code = trip.get("inviteCode")
+    
+    if not cached:
+        await cache_set(cache_key, orjson.dumps({"ownerID": userID, "inviteCode": invite_code}))
     
     return {
         "tripID": tripID,
@@ -871,33 +1233,30 @@ async def join_trip_by_invite_code(invite_code: str = Query(..., alias="inviteCo
     if not invite_code:
         raise HTTPException(status_code=400, detail="Invite code is required")
     
-    # Find trip by invite code
-    trip = await db.trips.find_one({"inviteCode": invite_code.upper()})
+    # Add the user in one atomic update; the filter only matches while they
+    # are not yet a member, so concurrent joins cannot overwrite each other
+    invite_code = invite_code.upper()
+    trip = await db.trips.find_one_and_update(
+        {"inviteCode": invite_code, "members": {"$ne": userID}},
+        {
+            "$addToSet": {"members": userID},
+            "$set": {"updatedAt": datetime.now(timezone.utc)}
+        },
+        projection={"tripID": 1, "title": 1, "_id": 0}
+    )
     
     if not trip:
-        raise HTTPException(status_code=404, detail="Invalid invite code")
-    
-    # Check if user is already a member
-    if userID in trip.get("members", []):
+        # Either the code is wrong or the user is already a member
+        trip = await db.trips.find_one({"inviteCode": invite_code}, {"tripID": 1, "_id": 0})
+        if not trip:
+            raise HTTPException(status_code=404, detail="Invalid invite code")
         return {
             "tripID": trip["tripID"],
             "message": "You are already a member of this trip",
             "alreadyMember": True
         }
     
-    # Add user to members list
-    members = trip.get("members", [])
-    if userID not in members:
-        members.append(userID)
-        await db.trips.update_one(
-            {"tripID": trip["tripID"]},
-            {
-                "$set": {
-                    "members": members,
-                    "updatedAt": datetime.utcnow()
-                }
-            }
-        )
+    await cache_delete(f"trip:{trip['tripID']}", f"dash:{userID}")
     
     return {
         "tripID": trip["tripID"],
@@ -1177,46 +1536,15 @@ async def get_trip_details(tripID: str):
             trip_summary="No suggestions have been submitted yet. Complete the brainstorming phase first."
         )
     
-    # Get all votes for this trip
-    votes_collection = db.votes
-    all_votes = await votes_collection.find({
-        "tripID": tripID
-    }).to_list(length=10000)
-    
-    # Aggregate activity votes
-    activity_votes = {}
-    for vote in all_votes:
-        if vote.get("voteType") == "activity":
-            activity_id = vote.get("optionID")
-            if activity_id not in activity_votes:
-                activity_votes[activity_id] = {"upvotes": 0, "downvotes": 0}
-            if vote.get("vote", True):
-                activity_votes[activity_id]["upvotes"] += 1
-            else:
-                activity_votes[activity_id]["downvotes"] += 1
-    
-    # Aggregate location votes
-    location_votes = {}
-    for vote in all_votes:
-        if vote.get("voteType") == "location":
-            location_id = vote.get("optionID")
-            if location_id not in location_votes:
-                location_votes[location_id] = {"upvotes": 0, "downvotes": 0}
-            if vote.get("vote", True):
-                location_votes[location_id]["upvotes"] += 1
-            else:
-                location_votes[location_id]["downvotes"] += 1
-    
-    # Aggregate cuisine votes
-    cuisine_votes = {}
-    for vote in all_votes:
-        if vote.get("voteType") == "food_cuisine":
-            cuisine_name = vote.get("optionID") or vote.get("voteValue")
-            if cuisine_name:
-                if cuisine_name not in cuisine_votes:
-                    cuisine_votes[cuisine_name] = {"votes": 0}
-                if vote.get("vote", True):
-                    cuisine_votes[cuisine_name]["votes"] += 1
+    # Count votes per option on the server, all poll types in one aggregation
+    vote_counts = await count_trip_votes(tripID)
+    activity_votes = option_vote_counts(vote_counts, "activity")
+    location_votes = option_vote_counts(vote_counts, "location")
+    # A cuisine counts as chosen once per upvote
+    cuisine_votes = {
+        cuisine_name: {"votes": counts["upvotes"]}
+        for cuisine_name, counts in option_vote_counts(vote_counts, "food_cuisine").items()
+    }
     
     # Extract all activities from suggestions
     all_activities_dict = {}
@@ -1326,7 +1654,7 @@ async def get_trip_details(tripID: str):
     
     # Generate final plan using create_final_plan
     try:
-        final_plan = create_final_plan(old_plans, poll_results)
+        final_plan = await create_final_plan(old_plans, poll_results)
         
         # Prepare response
         result = {
@@ -1532,6 +1860,9 @@ MOCK_ACTIVITIES = [
     }
 ]
 
+# The mock poll never changes, so its response body is encoded once at import
+MOCK_ACTIVITIES_JSON = orjson.dumps({"activities": MOCK_ACTIVITIES})
+
 MOCK_LOCATIONS = [
     {
         "location_id": "loc_001",
@@ -1585,15 +1916,89 @@ MOCK_CUISINES = [
     {"name": "French", "votes": 0, "selected": False}
 ]
 
+# Response bodies for the no-database fallbacks, encoded once at import
+MOCK_LOCATIONS_JSON = orjson.dumps({"locations": MOCK_LOCATIONS})
+MOCK_CUISINES_JSON = orjson.dumps({"cuisines": MOCK_CUISINES})
+MOCK_SUGGESTIONS_JSON = orjson.dumps({
+    "suggestions": [s["days"] for s in MOCK_SUGGESTIONS],
+    "participants": [s["userID"] for s in MOCK_SUGGESTIONS]
+})
+
+async def count_trip_votes(tripID: str, voteType: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Count a trip's up/downvotes per option with one aggregation on the server.
+    
+    Args:
+        voteType: Count only this vote type (all types when omitted)
+    
+    Returns:
+        {voteType: {"options": {optionID: {"upvotes": n, "downvotes": n}}, "total": n}},
+        where total counts every vote of that type
+    """
+    # Cuisine votes store the cuisine in optionID (older ones in voteValue),
+    # and a missing vote flag counts as an upvote
+    option = {"$ifNull": ["$optionID", "$voteValue"]}
+    is_upvote = {"$ifNull": ["$vote", True]}
+    
+    match = {"tripID": tripID}
+    if voteType:
+        match["voteType"] = voteType
+    cursor = await db.votes.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"voteType": "$voteType", "option": option},
+            "upvotes": {"$sum": {"$cond": [is_upvote, 1, 0]}},
+            "downvotes": {"$sum": {"$cond": [is_upvote, 0, 1]}}
+        }}
+    ])
+    
+    vote_counts = {}
+    async for doc in cursor:
+        type_counts = vote_counts.setdefault(doc["_id"].get("voteType"), {"options": {}, "total": 0})
+        type_counts["total"] += doc["upvotes"] + doc["downvotes"]
+        option_id = doc["_id"].get("option")
+        if option_id:
+            type_counts["options"][option_id] = {"upvotes": doc["upvotes"], "downvotes": doc["downvotes"]}
+    return vote_counts
+
+def option_vote_counts(vote_counts: Dict[str, dict], voteType: str) -> Dict[str, dict]:
+    """Per-option counts of one vote type from count_trip_votes()."""
+    return vote_counts.get(voteType, {}).get("options", {})
+
+async def get_vote_summary(tripID: str, voteType: str, userID: Optional[str] = None):
+    """
+    Summarise a trip's votes of one type.
+    
+    Up/downvotes are counted per option by an aggregation on the server, and
+    the user's own votes are fetched concurrently.
+    
+    Returns:
+        (vote_counts, user_votes): {optionID: {"upvotes": n, "downvotes": n}}
+        and {optionID: vote} for the given user (empty without userID)
+    """
+    async def count_votes():
+        return option_vote_counts(await count_trip_votes(tripID, voteType), voteType)
+    
+    async def fetch_user_votes():
+        if not userID:
+            return {}
+        cursor = db.votes.find(
+            {"tripID": tripID, "voteType": voteType, "userID": userID},
+            {"optionID": 1, "voteValue": 1, "vote": 1, "_id": 0}
+        )
+        return {
+            vote.get("optionID") or vote.get("voteValue"): vote.get("vote", True)
+            async for vote in cursor
+        }
+    
+    return await asyncio.gather(count_votes(), fetch_user_votes())
+
 @app.get("/get_all_trip_suggestions")
 async def get_all_trip_suggestions(tripID: str = Query(...)):
     """Get all trip suggestions from database."""
     if db is None:
         # Fallback to mock data if database not connected
-        return {
-            "suggestions": [s["days"] for s in MOCK_SUGGESTIONS],
-            "participants": [s["userID"] for s in MOCK_SUGGESTIONS]
-        }
+        return Response(content=MOCK_SUGGESTIONS_JSON, media_type="application/json")
     
     # Get all submitted suggestions for this trip
     suggestions = await db.trip_suggestions.find({
@@ -1615,35 +2020,10 @@ async def get_activity_poll(tripID: str = Query(...), userID: str = Query(None))
     """
     if db is None:
         # Fallback to mock data if database not connected
-        return {"activities": MOCK_ACTIVITIES}
-    
-    votes_collection = db.votes
-    
-    # Get all votes for activities in this trip
-    activity_votes = await votes_collection.find({
-        "tripID": tripID,
-        "voteType": "activity"
-    }).to_list(length=1000)
+        return Response(content=MOCK_ACTIVITIES_JSON, media_type="application/json")
     
-    # Aggregate votes by activityID
-    vote_counts = {}
-    user_votes = {}
-    
-    for vote in activity_votes:
-        activity_id = vote["optionID"]
-        
-        # Count upvotes and downvotes
-        if activity_id not in vote_counts:
-            vote_counts[activity_id] = {"upvotes": 0, "downvotes": 0}
-        
-        if vote["vote"]:
-            vote_counts[activity_id]["upvotes"] += 1
-        else:
-            vote_counts[activity_id]["downvotes"] += 1
-        
-        # Track user's vote if userID provided
-        if userID and vote["userID"] == userID:
-            user_votes[activity_id] = vote["vote"]
+    # Count votes per activity on the server
+    vote_counts, user_votes = await get_vote_summary(tripID, "activity", userID)
     
     # Get all submitted suggestions for this trip
     suggestions = await db.trip_suggestions.find({
@@ -1725,35 +2105,10 @@ async def get_location_poll(tripID: str = Query(...), userID: str = Query(None))
     """
     if db is None:
         # Fallback to mock data if database not connected
-        return {"locations": MOCK_LOCATIONS}
+        return Response(content=MOCK_LOCATIONS_JSON, media_type="application/json")
     
-    votes_collection = db.votes
-    
-    # Get all votes for locations in this trip
-    location_votes = await votes_collection.find({
-        "tripID": tripID,
-        "voteType": "location"
-    }).to_list(length=1000)
-    
-    # Aggregate votes by locationID
-    vote_counts = {}
-    user_votes = {}
-    
-    for vote in location_votes:
-        location_id = vote["optionID"]
-        
-        # Count upvotes and downvotes
-        if location_id not in vote_counts:
-            vote_counts[location_id] = {"upvotes": 0, "downvotes": 0}
-        
-        if vote["vote"]:
-            vote_counts[location_id]["upvotes"] += 1
-        else:
-            vote_counts[location_id]["downvotes"] += 1
-        
-        # Track user's vote if userID provided
-        if userID and vote["userID"] == userID:
-            user_votes[location_id] = vote["vote"]
+    # Count votes per location on the server
+    vote_counts, user_votes = await get_vote_summary(tripID, "location", userID)
     
     # Get all submitted suggestions for this trip
     suggestions = await db.trip_suggestions.find({
@@ -1831,36 +2186,10 @@ async def get_food_cuisines_poll(tripID: str = Query(...), userID: str = Query(N
     """
     if db is None:
         # Fallback to mock data if database not connected
-        return {"cuisines": MOCK_CUISINES}
+        return Response(content=MOCK_CUISINES_JSON, media_type="application/json")
     
-    votes_collection = db.votes
-    
-    # Get all cuisine votes for this trip
-    cuisine_votes = await votes_collection.find({
-        "tripID": tripID,
-        "voteType": "food_cuisine"
-    }).to_list(length=1000)
-    
-    # Count votes per cuisine (upvotes and downvotes)
-    vote_counts = {}
-    user_votes = {}
-    
-    for vote in cuisine_votes:
-        cuisine_name = vote.get("optionID") or vote.get("voteValue")  # optionID stores the cuisine name
-        
-        if cuisine_name:
-            # Count upvotes and downvotes
-            if cuisine_name not in vote_counts:
-                vote_counts[cuisine_name] = {"upvotes": 0, "downvotes": 0}
-            
-            if vote.get("vote", True):  # True means upvote (selected)
-                vote_counts[cuisine_name]["upvotes"] += 1
-            else:
-                vote_counts[cuisine_name]["downvotes"] += 1
-            
-            # Track user's vote if userID provided
-            if userID and vote["userID"] == userID:
-                user_votes[cuisine_name] = vote.get("vote", True)
+    # Count votes per cuisine on the server
+    vote_counts, user_votes = await get_vote_summary(tripID, "food_cuisine", userID)
     
     # Start with mock cuisines and enrich with real vote data
     cuisines = []
@@ -1897,86 +2226,76 @@ async def vote_food_cuisine(vote_data: dict):
     if not all([tripID, cuisineName, userID, vote is not None]):
         raise HTTPException(status_code=400, detail="Missing required fields: tripID, cuisineName, userID, vote")
     
-    votes_collection = db.votes
-    optionID = cuisineName
-    voteType = "food_cuisine"
-    
-    # Check if user already voted on this cuisine
-    vote_query = {
-        "tripID": tripID,
-        "userID": userID,
-        "optionID": optionID,
-        "voteType": voteType
+    action = await toggle_vote(
+        {"tripID": tripID, "userID": userID, "optionID": cuisineName, "voteType": "food_cuisine"},
+        vote
+    )
+    return vote_response(action, vote)
+
+# Upserts that can race on the unique vote index: the first try plus one retry
+VOTE_UPSERT_ATTEMPTS = 2
+
+VOTE_MESSAGES = {
+    "created": "Vote recorded successfully",
+    "updated": "Vote updated successfully"
+}
+
+def vote_response(action: str, vote):
+    """Build the response for a vote toggle; a removed vote has no body (204)."""
+    if action == "removed":
+        return Response(status_code=204)
+    return {
+        "message": VOTE_MESSAGES[action],
+        "vote": vote,
+        "action": action
     }
+
+async def toggle_vote(vote_query: dict, vote) -> str:
+    """
+    Record a user's vote on an option, atomically.
     
-    existing_vote = await votes_collection.find_one(vote_query)
-    
-    if existing_vote:
-        # User already voted - check if it's the same vote
-        if existing_vote["vote"] == vote:
-            # Same vote clicked - remove the vote (toggle off)
-            await votes_collection.delete_one({"_id": existing_vote["_id"]})
-            return {
-                "message": "Vote removed",
-                "vote": None,
-                "action": "removed"
-            }
-        else:
-            # Different vote - update the existing vote
-            await votes_collection.update_one(
-                {"_id": existing_vote["_id"]},
-                {
-                    "$set": {
-                        "vote": vote,
-                        "updatedAt": datetime.utcnow()
-                    }
-                }
+    Clicking the same vote again removes it (toggle off): a conditional
+    delete tries that first. Otherwise one upsert sets the vote and returns
+    the previous one: no previous vote means it was created, any other
+    means it was changed.
+    
+    Returns:
+        "created", "updated" or "removed"
+    """
+    # The IDs come from raw request JSON; an operator object such as
+    # {"$in": [...]} must never reach the filter
+    for field, value in vote_query.items():
+        if not isinstance(value, str):
+            raise HTTPException(status_code=400, detail=f"{field} must be a string")
+    
+    removed = await vote_writes.find_one_and_delete(
+        {**vote_query, "vote": {"$eq": vote}}, projection={"_id": 1}
+    )
+    if removed is not None:
+        return "removed"
+    
+    # Pipeline update so the timestamps come from the server clock ($$NOW);
+    # createdAt is only filled in when the upsert inserts the vote
+    update = [{"$set": {
+        "vote": {"$literal": vote},
+        "updatedAt": "$$NOW",
+        "createdAt": {"$ifNull": ["$createdAt", "$$NOW"]}
+    }}]
+    for _ in range(VOTE_UPSERT_ATTEMPTS):
+        try:
+            previous = await vote_writes.find_one_and_update(
+                vote_query, update, projection={"vote": 1, "_id": 0}, upsert=True
             )
-            return {
-                "message": "Vote updated successfully",
-                "vote": vote,
-                "action": "updated"
-            }
+            break
+        except DuplicateKeyError:
+            # A concurrent upsert inserted the same vote first. Retry as an
+            # upsert too: a concurrent toggle-off may delete it again before
+            # the retry runs, and the vote must still be written then
+            continue
     else:
-        # New vote - create it (works for both upvote and downvote, same as activities/locations)
-        vote_doc = {
-            "tripID": tripID,
-            "userID": userID,
-            "optionID": optionID,
-            "voteType": voteType,
-            "vote": vote,
-            "voteValue": cuisineName,  # Store cuisine name in voteValue
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
-        }
-        
-        try:
-            await votes_collection.insert_one(vote_doc)
-            return {
-                "message": "Vote recorded successfully",
-                "vote": vote,
-                "action": "created"
-            }
-        except Exception as e:
-            # Handle duplicate key error
-            if "duplicate" in str(e).lower() or "E11000" in str(e):
-                existing = await votes_collection.find_one(vote_query)
-                if existing:
-                    await votes_collection.update_one(
-                        {"_id": existing["_id"]},
-                        {
-                            "$set": {
-                                "vote": vote,
-                                "updatedAt": datetime.utcnow()
-                            }
-                        }
-                    )
-                    return {
-                        "message": "Vote updated successfully",
-                        "vote": vote,
-                        "action": "updated"
-                    }
-            raise HTTPException(status_code=500, detail=f"Failed to record vote: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not record vote")
+    
+    return "created" if previous is None else "updated"
 
 @app.post("/polls/vote/activity")
 async def vote_activity(vote_data: dict):
@@ -1995,86 +2314,11 @@ async def vote_activity(vote_data: dict):
     if not all([tripID, activityID, userID, vote is not None]):
         raise HTTPException(status_code=400, detail="Missing required fields: tripID, activityID, userID, vote")
     
-    votes_collection = db.votes
-    optionID = activityID
-    voteType = "activity"
-    
-    # Check if user already voted on this activity
-    vote_query = {
-        "tripID": tripID,
-        "userID": userID,
-        "optionID": optionID,
-        "voteType": voteType
-    }
-    
-    existing_vote = await votes_collection.find_one(vote_query)
-    
-    if existing_vote:
-        # User already voted - check if it's the same vote
-        if existing_vote["vote"] == vote:
-            # Same vote clicked - remove the vote (toggle off)
-            await votes_collection.delete_one({"_id": existing_vote["_id"]})
-            return {
-                "message": "Vote removed",
-                "vote": None,
-                "action": "removed"
-            }
-        else:
-            # Different vote - update the existing vote
-            await votes_collection.update_one(
-                {"_id": existing_vote["_id"]},
-                {
-                    "$set": {
-                        "vote": vote,
-                        "updatedAt": datetime.utcnow()
-                    }
-                }
-            )
-            return {
-                "message": "Vote updated successfully",
-                "vote": vote,
-                "action": "updated"
-            }
-    else:
-        # New vote - create it
-        vote_doc = {
-            "tripID": tripID,
-            "userID": userID,
-            "optionID": optionID,
-            "voteType": voteType,
-            "vote": vote,
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
-        }
-        
-        try:
-            await votes_collection.insert_one(vote_doc)
-            return {
-                "message": "Vote recorded successfully",
-                "vote": vote,
-                "action": "created"
-            }
-        except Exception as e:
-            # Handle duplicate key error (shouldn't happen, but just in case)
-            if "duplicate" in str(e).lower() or "E11000" in str(e):
-                # Vote was created between check and insert - try to update instead
-                existing = await votes_collection.find_one(vote_query)
-                if existing:
-                    await votes_collection.update_one(
-                        {"_id": existing["_id"]},
-                        {
-                            "$set": {
-                                "vote": vote,
-                                "updatedAt": datetime.utcnow()
-                            }
-                        }
-                    )
-                    return {
-                        "message": "Vote updated successfully",
-                        "vote": vote,
-                        "action": "updated"
-                    }
-            raise HTTPException(status_code=500, detail=f"Failed to record vote: {str(e)}")
+    action = await toggle_vote(
+        {"tripID": tripID, "userID": userID, "optionID": activityID, "voteType": "activity"},
+        vote
+    )
+    return vote_response(action, vote)
 
 
 @app.post("/polls/vote/location")
@@ -2094,85 +2338,11 @@ async def vote_location(vote_data: dict):
     if not all([tripID, locationID, userID, vote is not None]):
         raise HTTPException(status_code=400, detail="Missing required fields: tripID, locationID, userID, vote")
     
-    votes_collection = db.votes
-    optionID = locationID
-    voteType = "location"
-    
-    # Check if user already voted on this location
-    vote_query = {
-        "tripID": tripID,
-        "userID": userID,
-        "optionID": optionID,
-        "voteType": voteType
-    }
-    
-    existing_vote = await votes_collection.find_one(vote_query)
-    
-    if existing_vote:
-        # User already voted - check if it's the same vote
-        if existing_vote["vote"] == vote:
-            # Same vote clicked - remove the vote (toggle off)
-            await votes_collection.delete_one({"_id": existing_vote["_id"]})
-            return {
-                "message": "Vote removed",
-                "vote": None,
-                "action": "removed"
-            }
-        else:
-            # Different vote - update the existing vote
-            await votes_collection.update_one(
-                {"_id": existing_vote["_id"]},
-                {
-                    "$set": {
-                        "vote": vote,
-                        "updatedAt": datetime.utcnow()
-                    }
-                }
-            )
-            return {
-                "message": "Vote updated successfully",
-                "vote": vote,
-                "action": "updated"
-            }
-    else:
-        # New vote - create it
-        vote_doc = {
-            "tripID": tripID,
-            "userID": userID,
-            "optionID": optionID,
-            "voteType": voteType,
-            "vote": vote,
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
-        }
-        
-        try:
-            await votes_collection.insert_one(vote_doc)
-            return {
-                "message": "Vote recorded successfully",
-                "vote": vote,
-                "action": "created"
-            }
-        except Exception as e:
-            # Handle duplicate key error
-            if "duplicate" in str(e).lower() or "E11000" in str(e):
-                existing = await votes_collection.find_one(vote_query)
-                if existing:
-                    await votes_collection.update_one(
-                        {"_id": existing["_id"]},
-                        {
-                            "$set": {
-                                "vote": vote,
-                                "updatedAt": datetime.utcnow()
-                            }
-                        }
-                    )
-                    return {
-                        "message": "Vote updated successfully",
-                        "vote": vote,
-                        "action": "updated"
-                    }
-            raise HTTPException(status_code=500, detail=f"Failed to record vote: {str(e)}")
+    action = await toggle_vote(
+        {"tripID": tripID, "userID": userID, "optionID": locationID, "voteType": "location"},
+        vote
+    )
+    return vote_response(action, vote)
 
 @app.post("/polls/finish_voting")
 async def finish_voting(finish_data: dict):
@@ -2205,7 +2375,7 @@ async def finish_voting(finish_data: dict):
     completion_doc = {
         "tripID": tripID,
         "userID": userID,
-        "completedAt": datetime.utcnow()
+        "completedAt": datetime.now(timezone.utc)
     }
     
     await completion_collection.insert_one(completion_doc)
@@ -2285,45 +2455,22 @@ async def finalize_polls(finalize_data: dict):
             "pollIDs": [p["pollID"] for p in existing_polls]
         }
     
-    # Get all votes for this trip
-    votes_collection = db.votes
-    all_votes = await votes_collection.find({
-        "tripID": tripID
-    }).to_list(length=10000)
+    # Count votes per option on the server, all poll types in one aggregation
+    vote_counts = await count_trip_votes(tripID)
     
-    # Aggregate votes by poll type
     poll_types = ["activity", "location", "food_cuisine"]
     created_polls = []
+    now = datetime.now(timezone.utc)
     
     for poll_type in poll_types:
-        # Filter votes for this poll type
-        type_votes = [v for v in all_votes if v.get("voteType") == poll_type]
+        type_counts = vote_counts.get(poll_type)
         
-        if not type_votes:
+        if not type_counts:
             continue
         
-        # Aggregate votes by optionID
-        option_votes = {}
-        for vote in type_votes:
-            option_id = vote.get("optionID")
-            if not option_id:
-                continue
-            
-            if option_id not in option_votes:
-                option_votes[option_id] = {
-                    "upvotes": 0,
-                    "downvotes": 0,
-                    "optionID": option_id
-                }
-            
-            if vote.get("vote") is True:
-                option_votes[option_id]["upvotes"] += 1
-            elif vote.get("vote") is False:
-                option_votes[option_id]["downvotes"] += 1
-        
         # Create poll options with aggregated data
         options = []
-        for option_id, counts in option_votes.items():
+        for option_id, counts in type_counts["options"].items():
             net_score = counts["upvotes"] - counts["downvotes"]
             options.append({
                 "optionID": option_id,
@@ -2343,10 +2490,10 @@ async def finalize_polls(finalize_data: dict):
             "pollType": poll_type,
             "status": "completed",
             "options": options,
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow(),
-            "closedAt": datetime.utcnow(),
-            "totalVotes": len(type_votes)
+            "createdAt": now,
+            "updatedAt": now,
+            "closedAt": now,
+            "totalVotes": type_counts["total"]
         }
         
         await polls_collection.insert_one(poll_doc)
@@ -2426,6 +2573,8 @@ MOCK_DAYS = [
 
 MOCK_TRIP_SUMMARY = "I've created a wonderful 2-day trip to Barcelona! Day 1 includes a guided tour of the iconic Sagrada Familia basilica, one of Gaudí's masterpieces, followed by a visit to Park Güell with its colorful mosaics and panoramic city views. Day 2 is a relaxing beach day at Barceloneta Beach where you can enjoy the Mediterranean sun and sea. This itinerary balances cultural exploration with relaxation, perfect for experiencing Barcelona's unique architecture and beautiful coastline."
 
+MOCK_BRAINSTORM_JSON = orjson.dumps({"days": MOCK_DAYS, "trip_summary": MOCK_TRIP_SUMMARY})
+
 @app.get("/trip_brinstorm")
 async def trip_brinstorm(
     tripID: str = Query(...),
@@ -2447,17 +2596,165 @@ async def trip_brinstorm(
     
     # Call the brainstorm_chat function
     try:
-        result = brainstorm_chat(query, old_plan_json)
+        result = await brainstorm_chat(query, old_plan_json)
         # Ensure datetime objects are serialized properly
         # FastAPI will handle this, but we can also use json.dumps/loads to ensure proper format
         return result
     except Exception as e:
         # Fallback to mock data if OpenAI call fails
         print(f"Error calling brainstorm_chat: {e}")
-        return {
-            "days": MOCK_DAYS,
-            "trip_summary": MOCK_TRIP_SUMMARY
-        }
+        return Response(content=MOCK_BRAINSTORM_JSON, media_type="application/json")
+
+
+@app.get("/trip_brinstorm/stream")
+async def trip_brinstorm_stream(
+    tripID: str = Query(...),
+    userID: str = Query(...),
+    query: str = Query(...),
+    old_plan: str = Query(...),
+    tripSuggestionID: str = Query(...)
+):
+    """
+    Streaming variant of /trip_brinstorm.
+    Sends newline-delimited JSON events: one "activity" event per activity as it is
+    generated, then a "done" event with the full days list and trip summary.
+    """
+    try:
+        old_plan_json = json.loads(old_plan)
+    except (json.JSONDecodeError, TypeError):
+        old_plan_json = {}
+    
+    async def event_stream():
+        try:
+            async for event in stream_brainstorm_chat(query, old_plan_json):
+                yield orjson.dumps(event) + b"\n"
+        except Exception as e:
+            # Fallback to mock data if OpenAI call fails
+            print(f"Error streaming brainstorm_chat: {e}")
+            yield orjson.dumps({
+                "type": "done",
+                "days": MOCK_DAYS,
+                "trip_summary": MOCK_TRIP_SUMMARY
+            }) + b"\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+# Brainstorm jobs: the LLM call and transform run in background tasks so the
+# request returns immediately. Job state lives in Mongo, so any worker can
+# answer status polls; references to running tasks are kept so they are not
+# garbage-collected mid-flight.
+BRAINSTORM_JOB_CONCURRENCY = int(os.getenv("BRAINSTORM_JOB_CONCURRENCY", "8"))
+_brainstorm_job_slots = asyncio.Semaphore(BRAINSTORM_JOB_CONCURRENCY)
+_background_tasks: set = set()
+
+# Jobs run as in-process tasks, so a job whose process exits never finishes;
+# any job still unfinished this long after creation is reported as failed
+BRAINSTORM_JOB_TIMEOUT_SECONDS = int(os.getenv("BRAINSTORM_JOB_TIMEOUT_SECONDS", "300"))
+UNFINISHED_JOB_STATUSES = ["pending", "running"]
+STALE_JOB_ERROR = "Job did not finish in time (timed out or the server restarted)"
+
+def stale_job_filter(now: datetime) -> dict:
+    """Match jobs that are still unfinished past BRAINSTORM_JOB_TIMEOUT_SECONDS."""
+    return {
+        "status": {"$in": UNFINISHED_JOB_STATUSES},
+        "createdAt": {"$lt": now - timedelta(seconds=BRAINSTORM_JOB_TIMEOUT_SECONDS)}
+    }
+
+async def fail_stale_brainstorm_jobs():
+    """Mark jobs left unfinished by an earlier (restarted or crashed) process as failed."""
+    now = datetime.now(timezone.utc)
+    result = await db.brainstorm_jobs.update_many(
+        stale_job_filter(now),
+        {"$set": {"status": "failed", "error": STALE_JOB_ERROR, "finishedAt": now}}
+    )
+    if result.modified_count:
+        print(f"Marked {result.modified_count} stale brainstorm job(s) as failed")
+
+async def run_brainstorm_job(jobID: str, query: str, old_plan_json: dict, deadline: float):
+    """Run brainstorm_chat for a queued job and store the result on the job document."""
+    async with _brainstorm_job_slots:
+        await db.brainstorm_jobs.update_one(
+            {"jobID": jobID},
+            {"$set": {"status": "running", "startedAt": datetime.now(timezone.utc)}}
+        )
+        try:
+            # Time spent queued for a slot counts against the job's timeout
+            result = await asyncio.wait_for(
+                brainstorm_chat(query, old_plan_json),
+                max(deadline - time.monotonic(), 0)
+            )
+            update = {"status": "done", "result": result}
+        except asyncio.TimeoutError:
+            print(f"Brainstorm job {jobID} timed out")
+            update = {"status": "failed", "error": STALE_JOB_ERROR}
+        except Exception as e:
+            print(f"Error in brainstorm job {jobID}: {e}")
+            update = {"status": "failed", "error": str(e)}
+        update["finishedAt"] = datetime.now(timezone.utc)
+        await db.brainstorm_jobs.update_one({"jobID": jobID}, {"$set": update})
+
+@app.post("/trip_brinstorm/jobs", status_code=202)
+async def create_brainstorm_job(job_data: BrainstormJobCreate):
+    """
+    Queue a trip plan generation/iteration and return its job ID immediately.
+    Poll /trip_brinstorm/jobs/{jobID} for the result.
+    """
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    try:
+        old_plan_json = json.loads(job_data.old_plan)
+    except (json.JSONDecodeError, TypeError):
+        old_plan_json = {}
+    
+    jobID = generate_id("brainstorm_job")
+    await db.brainstorm_jobs.insert_one({
+        "jobID": jobID,
+        "tripID": job_data.tripID,
+        "userID": job_data.userID,
+        "tripSuggestionID": job_data.tripSuggestionID,
+        "status": "pending",
+        "createdAt": datetime.now(timezone.utc)
+    })
+    
+    deadline = time.monotonic() + BRAINSTORM_JOB_TIMEOUT_SECONDS
+    task = asyncio.create_task(run_brainstorm_job(jobID, job_data.query, old_plan_json, deadline))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    
+    return {"jobID": jobID, "status": "pending"}
+
+@app.get("/trip_brinstorm/jobs/{jobID}")
+async def get_brainstorm_job(jobID: str):
+    """Get the status of a brainstorm job, with its result once done."""
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    
+    job = await db.brainstorm_jobs.find_one(
+        {"jobID": jobID},
+        {"_id": 0, "jobID": 1, "status": 1, "result": 1, "error": 1, "createdAt": 1}
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # A job still unfinished past its timeout lost its task (e.g. to a
+    # restart of the process running it), so it will never complete
+    created_at = job.pop("createdAt", None)
+    now = datetime.now(timezone.utc)
+    if (
+        job["status"] in UNFINISHED_JOB_STATUSES
+        and created_at is not None
+        and created_at < now - timedelta(seconds=BRAINSTORM_JOB_TIMEOUT_SECONDS)
+    ):
+        await db.brainstorm_jobs.update_one(
+            {"jobID": jobID, **stale_job_filter(now)},
+            {"$set": {"status": "failed", "error": STALE_JOB_ERROR, "finishedAt": now}}
+        )
+        job["status"] = "failed"
+        job["error"] = STALE_JOB_ERROR
+    
+    return job
 
 
 @app.post("/create_final_plan")
@@ -2475,7 +2772,7 @@ async def create_final_plan_endpoint(request: CreateFinalPlanRequest):
         raise HTTPException(status_code=404, detail="Trip not found")
     
     # Verify user is a member of the trip
-    if request.userID not in trip.get("members", []) and request.userID != trip.get("ownerID"):
+    if not is_trip_member(request.userID, trip):
         raise HTTPException(status_code=403, detail="User is not a member of this trip")
     
     # Validate that old_plans is not empty
@@ -2484,7 +2781,7 @@ async def create_final_plan_endpoint(request: CreateFinalPlanRequest):
     
     try:
         # Call the create_final_plan function
-        result = create_final_plan(request.old_plans, request.poll_results)
+        result = await create_final_plan(request.old_plans, request.poll_results)
         return result
     except Exception as e:
         print(f"Error in create_final_plan_endpoint: {e}")
@@ -2509,15 +2806,16 @@ async def post_trip_suggestion(suggestion_data: dict):
         "tripSuggestionID": tripSuggestionID
     })
     
+    now = datetime.now(timezone.utc)
     suggestion_doc = {
         "tripSuggestionID": tripSuggestionID,
         "tripID": tripID,
         "userID": userID,
         "days": days,
         "status": "submitted",
-        "createdAt": datetime.utcnow(),
-        "updatedAt": datetime.utcnow(),
-        "submittedAt": datetime.utcnow()
+        "createdAt": now,
+        "updatedAt": now,
+        "submittedAt": now
     }
     
     if existing:
@@ -2528,8 +2826,8 @@ async def post_trip_suggestion(suggestion_data: dict):
                 "$set": {
                     "days": days,
                     "status": "submitted",
-                    "updatedAt": datetime.utcnow(),
-                    "submittedAt": datetime.utcnow()
+                    "updatedAt": now,
+                    "submittedAt": now
                 }
             }
         )
@@ -2561,15 +2859,6 @@ async def websocket_chat_endpoint(websocket: WebSocket, tripID: str):
     # Store verified userID for this connection
     verified_userID = None
     
-    # Helper function to check if user is a member
-    def is_trip_member(user_id, trip_doc):
-        """Check if user is owner or in members list."""
-        trip_owner = trip_doc.get("ownerID")
-        trip_members = trip_doc.get("members", [])
-        # Include owner in members check
-        all_members = list(set([trip_owner] + trip_members)) if trip_owner else trip_members
-        return user_id in all_members
-    
     try:
         while True:
             data = await websocket.receive_json()
@@ -2621,7 +2910,7 @@ async def websocket_chat_endpoint(websocket: WebSocket, tripID: str):
             userName = user.get("name", user.get("username", "Unknown")) if user else "Unknown"
             
             # Generate message ID
-            messageID = await get_next_id("chat_messages")
+            messageID = generate_id("msg")
             
             # Create message document
             message_doc = {
@@ -2630,7 +2919,7 @@ async def websocket_chat_endpoint(websocket: WebSocket, tripID: str):
                 "userID": userID,
                 "userName": userName,
                 "content": content,
-                "createdAt": datetime.utcnow()
+                "createdAt": datetime.now(timezone.utc)
             }
             
             # Save to database
@@ -2667,13 +2956,7 @@ async def get_chat_messages(tripID: str, userID: str = Query(...), limit: int =
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    # Check if user is owner or in members list
-    trip_owner = trip.get("ownerID")
-    trip_members = trip.get("members", [])
-    # Include owner in members check
-    all_members = list(set([trip_owner] + trip_members)) if trip_owner else trip_members
-    
-    if userID not in all_members:
+    if not is_trip_member(userID, trip):
         raise HTTPException(status_code=403, detail="You are not a member of this trip")
     
     # Get messages from database
@@ -2697,5 +2980,14 @@ async def get_chat_messages(tripID: str, userID: str = Query(...), limit: int =
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Chat connections are tracked in-process (ConnectionManager), so extra
+    # workers are opt-in via WEB_CONCURRENCY until broadcasts are shared
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1"))
+    )
 
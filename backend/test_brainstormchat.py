@@ -0,0 +1,44 @@
+from brainstormchat import _ActivityStreamScanner
+
+
+PLAN = (
+    '{"reply": "Try {this} and \\"that\\" [ok]", '
+    '"activities": ['
+    '{"name": "Caf\\u00e9 \\"Brace\\" }{", "notes": "a\\\\b ] [", "tags": [{"k": "}"}]}, '
+    '{"name": "Museum", "notes": "activities: [{"}'
+    '], "title": "x"}'
+)
+
+EXPECTED = [
+    {"name": "Café \"Brace\" }{", "notes": "a\\b ] [", "tags": [{"k": "}"}]},
+    {"name": "Museum", "notes": "activities: [{"},
+]
+
+
+def _feed_in_chunks(size):
+    scanner = _ActivityStreamScanner()
+    activities = []
+    for i in range(0, len(PLAN), size):
+        activities.extend(scanner.feed(PLAN[i:i + size]))
+    return scanner, activities
+
+
+def test_whole_output():
+    assert _ActivityStreamScanner().feed(PLAN) == EXPECTED
+
+
+def test_split_at_every_position():
+    for size in range(1, len(PLAN) + 1):
+        assert _feed_in_chunks(size)[1] == EXPECTED, size
+
+
+def test_split_key():
+    scanner = _ActivityStreamScanner()
+    assert scanner.feed('{"activ') == []
+    assert scanner.feed('ities": [{"name": "A"}') == [{"name": "A"}]
+    assert scanner.feed(']}') == []
+
+
+def test_consumed_text_is_dropped():
+    scanner, _ = _feed_in_chunks(1)
+    assert scanner._text == ""
@@ -19,9 +19,7 @@ function Login() {
     setLoading(true)
 
     try {
-      const response = await apiClient.get('/login', {
-        params: { username, password }
-      })
+      const response = await apiClient.post('/login', { username, password })
       
       login(response.data.userID)
       navigate('/dashboard')
@@ -206,7 +206,10 @@ function Suggestions() {
         vote
       })
       
-      const { action, vote: returnedVote } = response.data
+      // A removed (toggled off) vote comes back as 204 No Content
+      const { action, vote: returnedVote } = response.status === 204
+        ? { action: 'removed', vote: null }
+        : response.data
       const previousCuisine = cuisines.find(c => c.name === cuisineName)
       const previousVote = previousCuisine?.user_vote
       
@@ -297,7 +300,10 @@ function Suggestions() {
         vote
       })
       
-      const { action, vote: returnedVote } = response.data
+      // A removed (toggled off) vote comes back as 204 No Content
+      const { action, vote: returnedVote } = response.status === 204
+        ? { action: 'removed', vote: null }
+        : response.data
       const previousLocation = locations.find(loc => loc.location_id === locationID)
       const previousVote = previousLocation?.user_vote
       
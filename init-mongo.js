@@ -11,7 +11,8 @@ db.createCollection('locations');
 db.createCollection('trip_details');
 db.createCollection('chat_messages');
 db.createCollection('audit_logs');
-db.createCollection('id_counters');
+db.createCollection('brainstorm_jobs');
+db.createCollection('polling_completion');
 
 // Create indexes for users collection
 db.users.createIndex({ "userID": 1 }, { unique: true });
@@ -19,9 +20,11 @@ db.users.createIndex({ "username": 1 }, { unique: true });
 db.users.createIndex({ "email": 1 }, { unique: true });
 db.users.createIndex({ "isActive": 1 });
 db.users.createIndex({ "createdAt": -1 });
+db.users.createIndex({ "username": 1, "isActive": 1 });
 
 // Create indexes for trips collection
 db.trips.createIndex({ "tripID": 1 }, { unique: true });
+db.trips.createIndex({ "inviteCode": 1 }, { unique: true, sparse: true });
 db.trips.createIndex({ "ownerID": 1 });
 db.trips.createIndex({ "members": 1 });
 db.trips.createIndex({ "status": 1 });
@@ -32,6 +35,7 @@ db.trips.createIndex({ "ownerID": 1, "status": 1 });
 db.trip_suggestions.createIndex({ "tripSuggestionID": 1 }, { unique: true });
 db.trip_suggestions.createIndex({ "tripID": 1, "userID": 1 });
 db.trip_suggestions.createIndex({ "tripID": 1, "status": 1 });
+db.trip_suggestions.createIndex({ "tripID": 1, "status": 1, "userID": 1 });
 db.trip_suggestions.createIndex({ "tripID": 1, "submittedAt": -1 });
 
 // Create indexes for polls collection
@@ -40,10 +44,11 @@ db.polls.createIndex({ "tripID": 1, "pollType": 1 });
 db.polls.createIndex({ "tripID": 1, "status": 1 });
 
 // Create indexes for votes collection
-// Unique index to prevent duplicate votes: one vote per user per option (activity/location)
+// Unique index to prevent duplicate votes: one vote per user per option (activity/location/cuisine)
 db.votes.createIndex({ "tripID": 1, "userID": 1, "optionID": 1, "voteType": 1 }, { unique: true });
 db.votes.createIndex({ "tripID": 1, "userID": 1 });
 db.votes.createIndex({ "tripID": 1, "optionID": 1 });
+db.votes.createIndex({ "tripID": 1, "voteType": 1, "optionID": 1 });
 db.votes.createIndex({ "userID": 1 });
 db.votes.createIndex({ "createdAt": -1 });
 
@@ -52,9 +57,17 @@ db.locations.createIndex({ "locationID": 1 }, { unique: true });
 db.locations.createIndex({ "lat": 1, "lon": 1 });
 db.locations.createIndex({ "name": 1 });
 
+// Create indexes for polling_completion collection
+db.polling_completion.createIndex({ "tripID": 1, "userID": 1 });
+
 // Create indexes for chat_messages collection
 db.chat_messages.createIndex({ "messageID": 1 }, { unique: true });
 db.chat_messages.createIndex({ "tripID": 1, "createdAt": -1 });
 
+// Create indexes for brainstorm_jobs collection
+db.brainstorm_jobs.createIndex({ "jobID": 1 }, { unique: true });
+// Finished jobs are only polled briefly; expire them after a day
+db.brainstorm_jobs.createIndex({ "createdAt": 1 }, { expireAfterSeconds: 86400 });
+
 print("Database initialized successfully!");
 